@@ -0,0 +1,128 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OpenGL.GL import glFinish  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+from PyQt5.QtGui import QMatrix4x4, QVector3D  # noqa: E402
+
+from my_gl_widget import MyGLWidget  # noqa: E402
+from utils.camera import Camera  # noqa: E402
+
+CUBE_CORNERS = np.array(
+    [(x, y, z) for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)],
+    dtype=np.float32,
+)
+CUBE_INDICES = np.array(
+    [
+        0,
+        1,
+        3,
+        0,
+        3,
+        2,
+        4,
+        6,
+        7,
+        4,
+        7,
+        5,
+        0,
+        4,
+        5,
+        0,
+        5,
+        1,
+        2,
+        3,
+        7,
+        2,
+        7,
+        6,
+        0,
+        2,
+        6,
+        0,
+        6,
+        4,
+        1,
+        5,
+        7,
+        1,
+        7,
+        3,
+    ],
+    dtype=np.uint16,
+)
+
+
+def timed(widget, repeats):
+    # CPU time of paintGL and the time until the GPU is done with the frames
+    widget.makeCurrent()
+    widget.paintGL()
+    glFinish()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        widget.paintGL()
+    cpu = time.perf_counter() - start
+    glFinish()
+    total = time.perf_counter() - start
+    widget.doneCurrent()
+    return cpu / repeats, total / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="paintGL with and without static batching"
+    )
+    parser.add_argument("--figures", type=int, nargs="*", default=[100, 1000, 5000])
+    parser.add_argument(
+        "--hidden", type=float, default=0.5, help="share hidden for the second run"
+    )
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)  # noqa: F841
+    widget = MyGLWidget()
+    widget.resize(640, 480)
+    widget.show()
+    app.processEvents()
+    widget.camera = Camera(
+        position=QVector3D(0, 0, 40), yaw=-90.0, pitch=0.0, zoom_fov=45.0
+    )
+
+    rng = random.Random(0)
+    vertices = np.hstack([CUBE_CORNERS, CUBE_CORNERS]).ravel()
+    for count in args.figures:
+        while len(widget.additional_vaos) < count:
+            widget.loadModel(vertices, CUBE_INDICES)
+            model = QMatrix4x4()
+            model.translate(
+                rng.uniform(-15, 15), rng.uniform(-15, 15), rng.uniform(-15, 15)
+            )
+            model.scale(rng.uniform(0.2, 0.6))
+            widget.set_model_matrix(len(widget.additional_vaos) - 1, model)
+
+        for hidden in (0.0, args.hidden):
+            for index in range(count):
+                widget.set_figure_visible(index, index >= count * hidden)
+            results = []
+            for batching in (False, True):
+                widget.set_batching(batching)
+                results.append(timed(widget, args.repeats))
+            (off_cpu, off_total), (on_cpu, on_total) = results
+            print(
+                f"{count:>5} figures, {hidden:4.0%} hidden  per figure: CPU {off_cpu * 1e3:7.2f} ms"
+                f" (frame {off_total * 1e3:7.2f} ms)  batched: CPU {on_cpu * 1e3:7.2f} ms"
+                f" (frame {on_total * 1e3:7.2f} ms)  batches {len(widget.batches or [])}"
+            )
+
+
+if __name__ == "__main__":
+    main()
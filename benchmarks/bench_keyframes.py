@@ -0,0 +1,138 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.keyframes import KeyframeTrack  # noqa: E402
+from utils.timeline import TimelineBake  # noqa: E402
+
+
+def random_params(rng):
+    return {
+        "centroid": (rng.random(), rng.random(), rng.random()),
+        "size_x": rng.random(),
+        "size_y": rng.random(),
+        "size_z": rng.random(),
+        "rot_x": rng.random() * 360,
+        "rot_y": rng.random() * 360,
+        "rot_z": rng.random() * 360,
+    }
+
+
+def sorted_scan(params_in_frames, frame_num):
+    # the bracket search FigureItem.get_interpolated_params did before KeyframeTrack
+    keyframes = sorted(params_in_frames.keys())
+    if frame_num <= keyframes[0] or frame_num >= keyframes[-1]:
+        return None
+    prev_kf = keyframes[0]
+    next_kf = keyframes[-1]
+    for kf in keyframes:
+        if kf <= frame_num:
+            prev_kf = kf
+        if kf >= frame_num:
+            next_kf = kf
+            break
+    return prev_kf, next_kf
+
+
+class Figure:
+    # the parts of FigureItem the timeline bake reads
+    def __init__(self, track):
+        self.params_in_frames = track
+
+    def get_default_transform_params(self):
+        return random_params(random.Random(0))
+
+
+def per_frame_interpolation(figures, first, last):
+    rows = []
+    for frame in range(first, last + 1):
+        for figure in figures:
+            rows.append(figure.params_in_frames.interpolate(frame))
+    return rows
+
+
+def dict_bytes(params_in_frames):
+    # keyframes as {frame: {name: value}} dicts, counted with their keys and values
+    total = sys.getsizeof(params_in_frames)
+    for frame, params in params_in_frames.items():
+        total += sys.getsizeof(frame) + sys.getsizeof(params)
+        for name, value in params.items():
+            total += sys.getsizeof(name) + sys.getsizeof(value)
+            if isinstance(value, tuple):
+                total += sum(sys.getsizeof(c) for c in value)
+    return total
+
+
+def bench_bake(rng, figure_count, frame_count):
+    figures = [
+        Figure(
+            KeyframeTrack(
+                {f: random_params(rng) for f in range(1, frame_count + 1, 10)}
+            )
+        )
+        for _ in range(figure_count)
+    ]
+    start = time.perf_counter()
+    per_frame_interpolation(figures, 1, frame_count)
+    loop_time = time.perf_counter() - start
+
+    timeline = TimelineBake()
+    start = time.perf_counter()
+    timeline.bake(figures, 1, frame_count)
+    bake_time = time.perf_counter() - start
+
+    figures[0].params_in_frames[frame_count // 2 + 5] = random_params(rng)
+    start = time.perf_counter()
+    timeline.bake(figures, 1, frame_count)
+    rebake_time = time.perf_counter() - start
+    print(
+        f"{figure_count} figures x {frame_count} frames  per-frame loop {loop_time:6.3f} s"
+        f"  bake {bake_time:6.3f} s  re-bake after one edit {rebake_time * 1e3:6.2f} ms"
+    )
+
+
+def timed(func, frames):
+    start = time.perf_counter()
+    for frame in frames:
+        func(frame)
+    return (time.perf_counter() - start) / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="sorted() + scan vs KeyframeTrack lookups"
+    )
+    parser.add_argument(
+        "--keyframes", type=int, nargs="*", default=[10, 100, 1000, 10000]
+    )
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--figures", type=int, default=50)
+    parser.add_argument("--frames", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for count in args.keyframes:
+        params_in_frames = {4 * i + 1: random_params(rng) for i in range(count)}
+        track = KeyframeTrack(params_in_frames)
+        last = 4 * count
+        sequential = list(range(1, min(last, args.lookups) + 1))  # playback order
+        scattered = [rng.randint(1, last) for _ in range(args.lookups)]
+
+        scan = timed(lambda f: sorted_scan(params_in_frames, f), scattered)
+        bisected = timed(track.segment, scattered)
+        playback = timed(track.segment, sequential)
+        print(
+            f"{count:>6} keyframes  sorted+scan {scan * 1e6:9.1f} us"
+            f"  bisect {bisected * 1e6:6.2f} us  sequential {playback * 1e6:6.2f} us"
+            f"  memory/keyframe dict {dict_bytes(params_in_frames) / count:6.0f} B"
+            f"  track {track.nbytes / count:4.0f} B"
+        )
+    bench_bake(rng, args.figures, args.frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtGui import QMatrix4x4, QVector3D  # noqa: E402
+
+from utils.camera import Camera  # noqa: E402
+from utils.light_clusters import (
+    CLUSTER_GRID,
+    bin_lights,
+    clip_range,
+    depth_slice_params,
+)  # noqa: E402
+
+
+def stage_lights(rng, count, extent):
+    # point lights scattered over a stage floor, each reaching a few units
+    centers = np.column_stack(
+        [
+            rng.uniform(-extent, extent, count),
+            rng.uniform(0.2, 3.0, count),
+            rng.uniform(-extent, extent, count),
+        ]
+    )
+    return centers, rng.uniform(1.0, 4.0, count)
+
+
+def floor_fragments(rng, view, projection, count, extent):
+    # fragments on the floor plane that land on screen, with the cluster each one reads
+    points = np.column_stack(
+        [
+            rng.uniform(-extent, extent, count),
+            np.zeros(count),
+            rng.uniform(-extent, extent, count),
+        ]
+    )
+    view_points = points @ view[:3, :3].T + view[:3, 3]
+    clip = np.c_[view_points, np.ones(count)] @ projection.T
+    ndc = clip[:, :3] / clip[:, 3:4]
+    on_screen = (np.abs(ndc) <= 1).all(axis=1)
+    tiles_x, tiles_y, slices = CLUSTER_GRID
+    scale, bias = depth_slice_params(*clip_range(projection))
+    tile = np.floor((ndc[:, :2] * 0.5 + 0.5) * (tiles_x, tiles_y)).astype(int)
+    tile = np.minimum(tile, (tiles_x - 1, tiles_y - 1))
+    depth_slice = np.clip(
+        np.floor(np.log(-view_points[:, 2]) * scale - bias), 0, slices - 1
+    )
+    cluster = (depth_slice.astype(int) * tiles_y + tile[:, 1]) * tiles_x + tile[:, 0]
+    return points[on_screen], cluster[on_screen]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="clustered light binning: cost and lights per fragment"
+    )
+    parser.add_argument("--lights", type=int, nargs="*", default=[8, 64, 512])
+    parser.add_argument(
+        "--extent", type=float, default=20.0, help="half size of the stage"
+    )
+    parser.add_argument("--fragments", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    camera = Camera(
+        position=QVector3D(0, 12, 12), yaw=-90.0, pitch=-45.0, zoom_fov=60.0
+    )
+    view = np.array(camera.get_view_matrix().copyDataTo()).reshape(4, 4)
+    projection_matrix = QMatrix4x4()
+    projection_matrix.perspective(60.0, 16 / 9, 0.1, 100.0)
+    projection = np.array(projection_matrix.copyDataTo()).reshape(4, 4)
+
+    rng = np.random.default_rng(0)
+    for count in args.lights:
+        centers, radii = stage_lights(rng, count, args.extent)
+        view_centers = centers @ view[:3, :3].T + view[:3, 3]
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            clusters, indices = bin_lights(view_centers, radii, projection)
+        bin_time = (time.perf_counter() - start) / args.repeats
+
+        points, cluster = floor_fragments(
+            rng, view, projection, args.fragments, args.extent
+        )
+        listed = clusters[cluster, 1]  # loop length of each fragment in phong.frag
+        reached = (
+            np.linalg.norm(points[:, None, :] - centers[None, :, :], axis=2) < radii
+        ).sum(axis=1)
+        print(
+            f"{count:>4} lights  binning {bin_time * 1e3:6.2f} ms  "
+            f"lights per fragment: all {count}  clustered mean {listed.mean():6.1f}"
+            f" max {listed.max():4d}  actually in range {reached.mean():5.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
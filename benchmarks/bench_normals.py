@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loader.geometry import (
+    TRIANGLE_BATCH,
+    vertex_normals,
+    write_triangles,
+)  # noqa: E402
+from loader.obj_loader import load_obj_arrays  # noqa: E402
+
+
+def per_face_loop(vertices, faces):
+    # the normal loop MainWindow.load_model used before build_vertex_data
+    vertex_data = []
+    for face in faces:
+        v0 = np.array(vertices[face[0]])
+        v1 = np.array(vertices[face[1]])
+        v2 = np.array(vertices[face[2]])
+
+        normal = np.cross(v1 - v0, v2 - v0)
+        normal = (
+            normal / np.linalg.norm(normal)
+            if np.linalg.norm(normal) > 0
+            else np.array([0.0, 0.0, 1.0])
+        )
+
+        for idx in face[:3]:
+            pos = vertices[idx]
+            vertex_data.extend([*pos, *normal])
+
+    return np.array(vertex_data, dtype=np.float32)
+
+
+def build_vertex_data(vertices, faces, smooth=False):
+    # the whole-file vectorized build, [x, y, z, nx, ny, nz], three rows per triangle
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+
+    normals = vertex_normals(vertices, faces) if smooth else None
+    vertex_data = np.empty(len(faces) * 18, dtype=np.float32)
+    rows = vertex_data.reshape(-1, 6)
+    for start in range(0, len(faces), TRIANGLE_BATCH):
+        batch = faces[start : start + TRIANGLE_BATCH]
+        write_triangles(
+            rows[3 * start : 3 * (start + len(batch))], vertices, batch, normals
+        )
+    return vertex_data
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(
+        description="per-face normal loop vs build_vertex_data"
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        default=[
+            os.path.join(repo, "obj_file_expl", name)
+            for name in ("teapot.obj", "human.obj")
+        ],
+    )
+    args = parser.parse_args()
+
+    for path in args.files:
+        vertices, faces = load_obj_arrays(path)
+        reference, loop_time = timed(per_face_loop, vertices.tolist(), faces.tolist())
+        flat, flat_time = timed(build_vertex_data, vertices, faces)
+        _, smooth_time = timed(build_vertex_data, vertices, faces, smooth=True)
+
+        error = np.abs(reference - flat).max() if len(reference) else 0.0
+        print(
+            f"{os.path.basename(path):>12} {len(faces):>9} tris  loop {loop_time:7.3f} s"
+            f"  flat {flat_time:7.4f} s (x{loop_time / flat_time:6.0f}, max diff {error:.1e})"
+            f"  smooth {smooth_time:7.4f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
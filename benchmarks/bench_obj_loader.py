@@ -0,0 +1,106 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loader.obj_loader import load_obj, load_obj_arrays, load_obj_parallel  # noqa: E402
+
+
+def write_grid_mesh(path, faces):
+    # Quad grid written as "v//vn" faces, every quad becomes two triangles
+    side = max(2, int(np.sqrt(faces / 2)))
+    xs, zs = np.meshgrid(np.arange(side + 1), np.arange(side + 1))
+    ys = np.sin(xs * 0.1) * np.cos(zs * 0.1)
+    vertices = np.column_stack([xs.ravel(), ys.ravel(), zs.ravel()])
+
+    i, j = np.meshgrid(np.arange(side), np.arange(side))
+    a = (j * (side + 1) + i).ravel() + 1
+    quads = np.column_stack([a, a + 1, a + side + 2, a + side + 1])
+
+    with open(path, "w") as f:
+        np.savetxt(f, vertices, fmt="v %.6f %.6f %.6f")
+        np.savetxt(f, np.repeat(quads, 2, axis=1), fmt="f %d//%d %d//%d %d//%d %d//%d")
+    return 2 * len(quads)
+
+
+def check_cases(directory):
+    # small OBJ files that once tripped the bulk parser, all loaders must agree with load_obj
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        ref_vertices, ref_faces = load_obj(path)
+        ref_vertices = np.asarray(ref_vertices, dtype=np.float32).reshape(-1, 3)
+        ref_faces = np.asarray(ref_faces, dtype=np.int32).reshape(-1, 3)
+        same = all(
+            np.array_equal(vertices, ref_vertices) and np.array_equal(faces, ref_faces)
+            for vertices, faces in (load_obj_arrays(path), load_obj_parallel(path, 2))
+        )
+        print(f"{name:>24}  identical={same}")
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="load_obj vs load_obj_arrays vs load_obj_parallel"
+    )
+    parser.add_argument(
+        "--faces", type=int, nargs="+", default=[100_000, 1_000_000, 4_000_000]
+    )
+    parser.add_argument(
+        "--skip-reference",
+        action="store_true",
+        help="do not run the per-line load_obj (slow on large meshes)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="*",
+        default=[],
+        help="also time load_obj_parallel with these worker counts, e.g. 1 2 4 8",
+    )
+    args = parser.parse_args()
+
+    check_cases(os.path.join(os.path.dirname(os.path.abspath(__file__)), "obj_cases"))
+    with tempfile.TemporaryDirectory() as tmp:
+        for requested in args.faces:
+            path = os.path.join(tmp, f"grid_{requested}.obj")
+            triangles = write_grid_mesh(path, requested)
+            size_mb = os.path.getsize(path) / 2**20
+
+            (vertices, faces), bulk_time = timed(load_obj_arrays, path)
+            line = f"{triangles:>10} tris {size_mb:8.1f} MB  bulk {bulk_time:7.3f} s"
+
+            if not args.skip_reference:
+                (ref_vertices, ref_faces), ref_time = timed(load_obj, path)
+                same = np.array_equal(
+                    np.asarray(ref_faces, dtype=np.int32), faces
+                ) and np.array_equal(
+                    np.asarray(ref_vertices, dtype=np.float32), vertices
+                )
+                line += f"  per-line {ref_time:7.3f} s  x{ref_time / bulk_time:5.1f}  identical={same}"
+            print(line)
+
+            for workers in args.workers:
+                (par_vertices, par_faces), par_time = timed(
+                    load_obj_parallel, path, workers
+                )
+                same = np.array_equal(par_vertices, vertices) and np.array_equal(
+                    par_faces, faces
+                )
+                print(
+                    f"{'':>10}      {workers:>2} workers  {par_time:7.3f} s"
+                    f"  x{bulk_time / par_time:5.2f} vs bulk  identical={same}"
+                )
+
+
+if __name__ == "__main__":
+    main()
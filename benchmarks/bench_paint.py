@@ -0,0 +1,179 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OpenGL.GL import (  # noqa: E402
+    glBindVertexArray,
+    glClear,
+    glClearColor,
+    glDrawArrays,
+    glDrawElements,
+    glFinish,
+    GL_COLOR_BUFFER_BIT,
+    GL_DEPTH_BUFFER_BIT,
+    GL_TRIANGLES,
+)
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+from PyQt5.QtGui import QMatrix4x4, QVector3D  # noqa: E402
+
+from my_gl_widget import MATERIAL, MyGLWidget  # noqa: E402
+
+CUBE_CORNERS = np.array(
+    [(x, y, z) for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)],
+    dtype=np.float32,
+)
+CUBE_INDICES = np.array(
+    [
+        0,
+        1,
+        3,
+        0,
+        3,
+        2,
+        4,
+        6,
+        7,
+        4,
+        7,
+        5,
+        0,
+        4,
+        5,
+        0,
+        5,
+        1,
+        2,
+        3,
+        7,
+        2,
+        7,
+        6,
+        0,
+        2,
+        6,
+        0,
+        6,
+        4,
+        1,
+        5,
+        7,
+        1,
+        7,
+        3,
+    ],
+    dtype=np.uint16,
+)
+
+
+def cube_vertices():
+    # position + (unnormalized) normal pointing away from the center
+    return np.hstack([CUBE_CORNERS, CUBE_CORNERS]).ravel()
+
+
+def paint_by_name(widget):
+    # the same frame without the caches: every uniform by name, the constant
+    # material values and a normal matrix per figure on every frame, and the
+    # light texture buffers repacked and the clusters rebuilt on every frame
+    # instead of only after a change
+    glClearColor(widget.color[0], widget.color[1], widget.color[2], 1.0)
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    program = widget.shader_program
+    program.bind()
+    view = widget.camera.get_view_matrix()
+    projection = widget.camera.get_projection_matrix(
+        widget.width() / max(1, widget.height())
+    )
+    program.setUniformValue("view", view)
+    program.setUniformValue("projection", projection)
+    position = widget.camera.position
+    program.setUniformValue("viewPos", position.x(), position.y(), position.z())
+    for name, value in MATERIAL.items():
+        program.setUniformValue(name, *value)
+    program.setUniformValue("batched", 0)
+    widget.lights_dirty = True
+    widget.uploaded_lights = None
+    widget.cluster_key = None
+    widget.upload_lights(view, projection)
+    for vao, ebo, index_type, count, visible, model in zip(
+        widget.additional_vaos,
+        widget.additional_ebos,
+        widget.additional_index_types,
+        widget.additional_vertex_counts,
+        widget.additional_visible_flags,
+        widget.additional_model_matrices,
+    ):
+        if not visible:
+            continue
+        program.setUniformValue("M", model)
+        program.setUniformValue("normalMatrix", model.normalMatrix())
+        glBindVertexArray(vao)
+        if ebo:
+            glDrawElements(GL_TRIANGLES, count, index_type, None)
+        else:
+            glDrawArrays(GL_TRIANGLES, 0, count)
+    glBindVertexArray(0)
+    program.release()
+
+
+def timed(paint, widget, repeats):
+    widget.makeCurrent()
+    paint()
+    glFinish()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        paint()
+    elapsed = time.perf_counter() - start  # CPU side only, the GPU runs behind
+    glFinish()
+    widget.doneCurrent()
+    return elapsed / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU time per MyGLWidget.paintGL")
+    parser.add_argument("--figures", type=int, nargs="*", default=[10, 100, 1000])
+    parser.add_argument("--lights", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)  # noqa: F841
+    widget = MyGLWidget()
+    widget.resize(640, 480)
+    widget.show()
+    app.processEvents()
+    for i in range(args.lights):
+        widget.add_light(
+            {
+                "position": QVector3D(5 - i, 5, 5),
+                "ambient": QVector3D(0.05, 0.05, 0.05),
+                "diffuse": QVector3D(0.2, 0.2, 0.2),
+                "specular": QVector3D(0.3, 0.3, 0.3),
+                "range": 6.0,  # binned into clusters like lights added in the editor
+                "visible": True,
+            }
+        )
+
+    rng = random.Random(0)
+    vertices = cube_vertices()
+    for count in args.figures:
+        while len(widget.additional_vaos) < count:
+            widget.loadModel(vertices, CUBE_INDICES)
+            model = QMatrix4x4()
+            model.translate(rng.uniform(-4, 4), rng.uniform(-4, 4), rng.uniform(-4, 4))
+            widget.set_model_matrix(len(widget.additional_vaos) - 1, model)
+
+        by_name = timed(lambda: paint_by_name(widget), widget, args.repeats)
+        cached = timed(widget.paintGL, widget, args.repeats)
+        print(
+            f"{count:>5} figures, {len(widget.lights)} lights  by name {by_name * 1e3:7.3f} ms"
+            f"  cached, lights uploaded on change {cached * 1e3:7.3f} ms  ({by_name / cached:4.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
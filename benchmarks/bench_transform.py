@@ -0,0 +1,120 @@
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loader.obj_loader import load_obj_streaming  # noqa: E402
+from utils.transform import (
+    apply_transform,
+    apply_transforms,
+    transform_matrix,
+)  # noqa: E402
+
+PARAMS = {
+    "centroid": (1.5, -2.0, 3.0),
+    "size_x": 2.0,
+    "size_y": 0.5,
+    "size_z": 1.3,
+    "rot_x": 30.0,
+    "rot_y": -50.0,
+    "rot_z": 70.0,
+}
+
+
+def centroid(vertex_data):
+    x_total, y_total, z_total = 0.0, 0.0, 0.0
+    count = 0
+    for i in range(0, len(vertex_data), 6):
+        x_total += vertex_data[i]
+        y_total += vertex_data[i + 1]
+        z_total += vertex_data[i + 2]
+        count += 1
+    return x_total / count, y_total / count, z_total / count
+
+
+def python_loops(vertex_data, params):
+    # what FigureItem.apply_scale, apply_rotation and apply_location did
+    cx, cy, cz = centroid(vertex_data)
+    for i in range(0, len(vertex_data), 6):
+        vertex_data[i] = (vertex_data[i] - cx) * params["size_x"] + cx
+        vertex_data[i + 1] = (vertex_data[i + 1] - cy) * params["size_y"] + cy
+        vertex_data[i + 2] = (vertex_data[i + 2] - cz) * params["size_z"] + cz
+
+    rx = math.radians(params["rot_y"])
+    ry = math.radians(params["rot_x"])
+    rz = math.radians(params["rot_z"])
+    cx, cy, cz = centroid(vertex_data)
+    for i in range(0, len(vertex_data), 6):
+        x = vertex_data[i] - cx
+        y = vertex_data[i + 1] - cy
+        z = vertex_data[i + 2] - cz
+        y, z = y * math.cos(rx) - z * math.sin(rx), y * math.sin(rx) + z * math.cos(rx)
+        x, z = x * math.cos(ry) + z * math.sin(ry), -x * math.sin(ry) + z * math.cos(ry)
+        x, y = x * math.cos(rz) - y * math.sin(rz), x * math.sin(rz) + y * math.cos(rz)
+        vertex_data[i] = x + cx
+        vertex_data[i + 1] = y + cy
+        vertex_data[i + 2] = z + cz
+
+    cx, cy, cz = centroid(vertex_data)
+    tx, ty, tz = params["centroid"]
+    for i in range(0, len(vertex_data), 6):
+        vertex_data[i] += tx - cx
+        vertex_data[i + 1] += ty - cy
+        vertex_data[i + 2] += tz - cz
+    return vertex_data
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(
+        description="Python transform loops vs the NumPy kernel"
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        default=[
+            os.path.join(repo, "obj_file_expl", name)
+            for name in ("teapot.obj", "human.obj")
+        ],
+    )
+    parser.add_argument(
+        "--figures", type=int, default=16, help="copies for the batched run"
+    )
+    args = parser.parse_args()
+
+    for path in args.files:
+        vertex_data, _, _ = load_obj_streaming(path)
+        pivot = vertex_data.reshape(-1, 6)[:, :3].astype(np.float64).mean(axis=0)
+        matrix = transform_matrix(PARAMS, pivot)
+
+        reference, loop_time = timed(
+            python_loops, vertex_data.astype(np.float64), PARAMS
+        )
+        baked, kernel_time = timed(apply_transform, vertex_data.copy(), matrix)
+        _, batch_time = timed(
+            apply_transforms, [vertex_data] * args.figures, [matrix] * args.figures
+        )
+        error = np.abs(
+            reference.reshape(-1, 6)[:, :3] - baked.reshape(-1, 6)[:, :3]
+        ).max()
+        print(
+            f"{os.path.basename(path):>12} {len(vertex_data) // 6:>9} rows"
+            f"  loops {loop_time:7.3f} s  kernel {kernel_time:7.4f} s"
+            f" (x{loop_time / kernel_time:5.0f}, max diff {error:.1e})"
+            f"  {args.figures} figures batched {batch_time:7.4f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OpenGL.GL import (  # noqa: E402
+    glBindBuffer,
+    glBufferData,
+    glBufferSubData,
+    glFinish,
+    GL_ARRAY_BUFFER,
+    GL_DYNAMIC_DRAW,
+    GL_STATIC_DRAW,
+)
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from my_gl_widget import MyGLWidget  # noqa: E402
+
+VERTEX_FLOATS = 6  # x, y, z, nx, ny, nz
+# above this share of changed bytes the whole buffer is replaced (orphaned)
+# instead of patched range by range
+ORPHAN_FRACTION = 0.5
+
+
+def changed_ranges(old, new, block=64):
+    """Runs of vertices that differ between two vertex arrays of the same length.
+
+    Returns a list of (first, stop) vertex indices, stop exclusive. The
+    arrays are compared in blocks of `block` vertices and a run always
+    covers whole blocks: one slightly larger upload is cheaper than many
+    small glBufferSubData calls, and the test stays a couple of array
+    passes even when every vertex moved.
+    """
+    differs = np.asarray(old).ravel() != np.asarray(new).ravel()
+    count = len(differs) // VERTEX_FLOATS
+    width = block * VERTEX_FLOATS
+    full = len(differs) // width
+    changed = differs[: full * width].reshape(full, width).any(axis=1)
+    if full * width < len(differs):
+        changed = np.append(changed, differs[full * width :].any())
+    # edges of the runs of changed blocks
+    edges = np.flatnonzero(np.diff(np.r_[False, changed, False]))
+    firsts = edges[0::2] * block
+    stops = np.minimum(edges[1::2] * block, count)
+    return list(zip(firsts.tolist(), stops.tolist()))
+
+
+def reallocate(widget, model_index, vertices):
+    # what MyGLWidget.updateModelVertices did: new GL_STATIC_DRAW storage every call
+    widget.makeCurrent()
+    glBindBuffer(GL_ARRAY_BUFFER, widget.additional_vbos[model_index])
+    glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    widget.doneCurrent()
+    return vertices.nbytes
+
+
+def partial_uploader():
+    """An upload function that sends only the vertex ranges that changed.
+
+    The first call moves the figure to a GL_DYNAMIC_DRAW buffer; after that
+    only the ranges that differ from the previous upload are written with
+    glBufferSubData. When most of the buffer changes, the storage is
+    orphaned with a full glBufferData of the same size, so the driver hands
+    out fresh memory instead of waiting for the GPU to finish reading the
+    old one. Returns the bytes sent.
+    """
+    uploaded_vertices = {}  # model index -> copy of the last upload
+
+    def upload(widget, model_index, vertices):
+        previous = uploaded_vertices.get(model_index)
+        if previous is not None and previous.shape == vertices.shape:
+            ranges = changed_ranges(previous, vertices)
+            if not ranges:
+                return 0
+            row = VERTEX_FLOATS * vertices.itemsize
+            changed = sum(stop - first for first, stop in ranges) * row
+        else:
+            ranges = None  # new or resized buffer
+
+        widget.makeCurrent()
+        glBindBuffer(GL_ARRAY_BUFFER, widget.additional_vbos[model_index])
+        if ranges is None or changed > ORPHAN_FRACTION * vertices.nbytes:
+            glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_DYNAMIC_DRAW)
+            sent = vertices.nbytes
+        else:
+            for first, stop in ranges:
+                glBufferSubData(
+                    GL_ARRAY_BUFFER,
+                    first * row,
+                    (stop - first) * row,
+                    vertices[first * VERTEX_FLOATS : stop * VERTEX_FLOATS],
+                )
+            sent = changed
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        widget.doneCurrent()
+
+        if ranges is None:
+            # a copy, the caller keeps editing its array in place
+            uploaded_vertices[model_index] = vertices.copy()
+        else:
+            for first, stop in ranges:
+                span = slice(first * VERTEX_FLOATS, stop * VERTEX_FLOATS)
+                previous[span] = vertices[span]
+        return sent
+
+    return upload
+
+
+def deform(vertices, frame, moving):
+    # a patch of `moving` vertices shifts a little, somewhere else every frame
+    count = len(vertices) // 6
+    start = (frame * 7919) % (count - moving + 1)
+    vertices[start * 6 : (start + moving) * 6 : 6] += 0.01
+
+
+def timed(upload, widget, vertices, moving, frames):
+    upload(widget, 0, vertices)
+    uploaded = 0
+    upload_time = 0.0
+    start = time.perf_counter()
+    for frame in range(frames):
+        deform(vertices, frame, moving)
+        before = time.perf_counter()
+        uploaded += upload(widget, 0, vertices)
+        upload_time += time.perf_counter() - before
+        widget.repaint()  # the next upload has to wait for or work around this draw
+    widget.makeCurrent()
+    glFinish()
+    widget.doneCurrent()
+    total = time.perf_counter() - start
+    return uploaded / frames, upload_time / frames, total / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="vertex upload per frame of a deforming figure"
+    )
+    parser.add_argument("--vertices", type=int, default=300000)
+    parser.add_argument(
+        "--moving", type=float, nargs="*", default=[0.01, 0.05, 0.25, 1.0]
+    )
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)  # noqa: F841
+    widget = MyGLWidget()
+    widget.resize(640, 480)
+    widget.show()
+    app.processEvents()
+
+    rng = np.random.default_rng(0)
+    vertices = rng.standard_normal(args.vertices * 6).astype(np.float32)
+    widget.loadModel(vertices)
+    for share in args.moving:
+        moving = max(1, int(args.vertices * share))
+        results = [
+            timed(upload, widget, vertices, moving, args.frames)
+            for upload in (reallocate, partial_uploader())
+        ]
+        (old_bytes, old_upload, old_frame), (new_bytes, new_upload, new_frame) = results
+        print(
+            f"{share:5.0%} moving  glBufferData {old_bytes / 1e6:6.2f} MB"
+            f" {old_upload * 1e3:6.2f} ms ({old_frame * 1e3:6.2f} ms/frame)"
+            f"  changed ranges {new_bytes / 1e6:6.2f} MB"
+            f" {new_upload * 1e3:6.2f} ms ({new_frame * 1e3:6.2f} ms/frame)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import math
 from PyQt5.QtWidgets import (
     QWidget,
     QHBoxLayout,
@@ -6,9 +5,14 @@ from PyQt5.QtWidgets import (
     QLabel,
     QLineEdit,
     QMessageBox,
+    QProgressBar,
 )
-from PyQt5.QtGui import QVector3D
+from PyQt5.QtGui import QVector3D, QMatrix4x4
+from utils.bounds import Bounds
+from utils.keyframes import LIGHT_FIELDS, TRANSFORM_FIELDS, KeyframeTrack, unpack
+from utils.static_batches import model_texels
 from utils.styles import pressed_button_style
+from utils.transform import transform_matrix
 
 
 class LightItem(QWidget):
@@ -21,7 +25,7 @@ class LightItem(QWidget):
         self.index = index
         self.light = light
 
-        self.params_in_frames = {}
+        self.params_in_frames = KeyframeTrack(fields=LIGHT_FIELDS)
 
         layout = QHBoxLayout()
         self.name_button = QPushButton(name)
@@ -50,25 +54,45 @@ class LightItem(QWidget):
         current_state = self.toggle_button.isChecked()
         self.gl_widget.lights[self.index]["visible"] = current_state
         self.update_icon()
-        self.gl_widget.update()
+        self.gl_widget.lights_changed()
 
     def on_name_button_clicked(self):
         self.display_figure_params()
         # self.main_window.set_chosen_figure(self)
-    
+
     def update_icon(self):
         if self.toggle_button.isChecked():
             self.toggle_button.setText("✖")  # figure visible
         else:
             self.toggle_button.setText("")  # figure invisible
 
-    def fill_params_for_frame_1(self):
-        self.params_in_frames[1] = {
-            'position': self.light['position'],
-            'ambient': self.light['ambient'],
-            'diffuse': self.light['diffuse'],
-            'specular': self.light['specular']
+    def get_default_light_params(self):
+        params = {
+            name: (self.light[name].x(), self.light[name].y(), self.light[name].z())
+            for name, width in LIGHT_FIELDS
+            if width == 3
         }
+        params["range"] = self.light["range"]
+        return params
+
+    def get_params_for_ui_display(self, frame_num_in_ui):
+        if not self.params_in_frames:
+            return self.get_default_light_params()
+        return self.params_in_frames.held(frame_num_in_ui)
+
+    def set_light_values(self, params):
+        # self.light is the dict the GL widget draws from
+        for name, width in LIGHT_FIELDS:
+            if width == 3:
+                self.light[name] = QVector3D(*params[name])
+        self.light["range"] = max(0.0, float(params["range"]))
+        self.gl_widget.lights_changed()
+
+    def update_visual_state(self, frame_num_to_display_state_of):
+        if self.params_in_frames:
+            self.set_light_values(
+                self.get_params_for_ui_display(frame_num_to_display_state_of)
+            )
 
     def delete_self(self):
         # print(f"Deleting light {self.name} with index {self.index}")
@@ -82,8 +106,12 @@ class LightItem(QWidget):
         clear_layout(self.main_window.parameters_object_area)
         self.main_window.param_frame_number.setText("Object in frame not chosen")
         self.main_window.param_object_name.setText("Object not selected")
-        self.main_window.parameters_object_area.addWidget(self.main_window.param_object_name)
-        self.main_window.parameters_frame_area.addWidget(self.main_window.param_frame_number)      
+        self.main_window.parameters_object_area.addWidget(
+            self.main_window.param_object_name
+        )
+        self.main_window.parameters_frame_area.addWidget(
+            self.main_window.param_frame_number
+        )
         self.setParent(None)
         self.parent_layout.removeWidget(self)
         self.deleteLater()
@@ -96,27 +124,16 @@ class LightItem(QWidget):
         if chosen_frame_number == -1:
             chosen_frame_number = 1  # jeśli nic nie wybrano, ustawiamy frame 1
 
+        self.main_window.param_frame_number.setText(
+            f"Parameters for {self.name} in frame #{chosen_frame_number}"
+        )
 
-        self.main_window.param_frame_number.setText(f"Parameters for {self.name} in frame #{chosen_frame_number}")
-
-
-        if 1 not in self.params_in_frames or not self.params_in_frames[1]:
-            self.fill_params_for_frame_1()
-
-        # Jeśli brak parametrów dla wybranego frame, użyj frame 1 jako domyślnych
-        if chosen_frame_number not in self.params_in_frames or not self.params_in_frames[chosen_frame_number]:
-            current_params = self.params_in_frames.get(1, {})
-        else:
-            current_params = self.params_in_frames[chosen_frame_number]
-
-        # position = current_params.get("position", (0.0, 0.0, 0.0))
-        # ambient = current_params.get("ambient", (0.25, 0.25, 0.25))
-        # diffuse = current_params.get("diffuse", (0.75, 0.75, 0.75))
-        # specular = current_params.get("specular", (1.0, 1.0, 1.0))
-        position = self.light.get("position", QVector3D(0.0, 0.0, 0.0))
-        ambient = self.light.get("ambient", QVector3D(0.25, 0.25, 0.25))
-        diffuse = self.light.get("diffuse", QVector3D(0.75, 0.75, 0.75))
-        specular = self.light.get("specular", QVector3D(1.0, 1.0, 1.0))
+        params_to_show = self.get_params_for_ui_display(chosen_frame_number)
+        position = params_to_show["position"]
+        ambient = params_to_show["ambient"]
+        diffuse = params_to_show["diffuse"]
+        specular = params_to_show["specular"]
+        light_range = params_to_show["range"]
 
         # Position
         self.position_title = QLabel("Position")
@@ -166,6 +183,11 @@ class LightItem(QWidget):
         self.specular_box.addWidget(self.spec_g_text)
         self.specular_box.addWidget(QLabel("B:"))
         self.specular_box.addWidget(self.spec_b_text)
+        # Range
+        self.range_title = QLabel("Range (0 = unlimited)")
+        self.range_box = QHBoxLayout()
+        self.range_text = QLineEdit(str(light_range))
+        self.range_box.addWidget(self.range_text)
         # Apply button
         self.apply_btn = QPushButton("Apply")
         self.apply_btn.clicked.connect(self.apply_light_params)
@@ -178,36 +200,110 @@ class LightItem(QWidget):
         section_layout.addLayout(self.diffuse_box)
         section_layout.addWidget(self.specular_title)
         section_layout.addLayout(self.specular_box)
+        section_layout.addWidget(self.range_title)
+        section_layout.addLayout(self.range_box)
         section_layout.addWidget(self.apply_btn)
 
     def apply_light_params(self):
-        self.light["position"] = QVector3D(
-            float(self.pos_x_text.text()),
-            float(self.pos_y_text.text()),
-            float(self.pos_z_text.text())
-        )
-        self.light["ambient"] = QVector3D(
-            float(self.amb_r_text.text()),
-            float(self.amb_g_text.text()),
-            float(self.amb_b_text.text())
-        )
-        self.light["diffuse"] = QVector3D(
-            float(self.diff_r_text.text()),
-            float(self.diff_g_text.text()),
-            float(self.diff_b_text.text())
-        )
-        self.light["specular"] = QVector3D(
-            float(self.spec_r_text.text()),
-            float(self.spec_g_text.text()),
-            float(self.spec_b_text.text())
-        )
+        chosen_frame_number = self.main_window.get_chosen_frame()
+        if chosen_frame_number == -1:
+            chosen_frame_number = 1
+
+        # without keyframes the light is static and edited directly
+        if self.params_in_frames and chosen_frame_number not in self.params_in_frames:
+            QMessageBox.warning(
+                self,
+                "Update Params Error",
+                "Cannot change light params without keyframe selected. "
+                "Please create a keyframe first.",
+            )
+            return
+
+        try:
+            params = {
+                "position": (
+                    float(self.pos_x_text.text()),
+                    float(self.pos_y_text.text()),
+                    float(self.pos_z_text.text()),
+                ),
+                "ambient": (
+                    float(self.amb_r_text.text()),
+                    float(self.amb_g_text.text()),
+                    float(self.amb_b_text.text()),
+                ),
+                "diffuse": (
+                    float(self.diff_r_text.text()),
+                    float(self.diff_g_text.text()),
+                    float(self.diff_b_text.text()),
+                ),
+                "specular": (
+                    float(self.spec_r_text.text()),
+                    float(self.spec_g_text.text()),
+                    float(self.spec_b_text.text()),
+                ),
+                "range": max(0.0, float(self.range_text.text())),
+            }
+        except ValueError:
+            print("Błąd: wprowadzone wartości muszą być liczbami")
+            return
+
+        if self.params_in_frames:
+            self.params_in_frames[chosen_frame_number] = params
         # Update the light in the OpenGL widget
-        self.gl_widget.lights[self.index] = self.light
-        self.gl_widget.update()
+        self.set_light_values(params)
+
+
+class LoadingItem(QWidget):
+    def __init__(self, name, task):
+        super().__init__()
+        self.name = name
+        self.task = task
+
+        layout = QHBoxLayout()
+        self.name_label = QLabel(name)
+        self.name_label.setStyleSheet("border: none;")
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setFixedHeight(16)
+
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setStyleSheet(
+            "background-color: lightgray; color: black; padding: 0px; margin: 0px;"
+            + pressed_button_style
+        )
+        self.cancel_button.setFixedSize(60, 24)
+        self.cancel_button.clicked.connect(self.cancel)
+
+        task.signals.progress.connect(self.progress_bar.setValue)
+
+        layout.addWidget(self.name_label)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.cancel_button)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+    def cancel(self):
+        self.task.cancel()
+        self.cancel_button.setEnabled(False)
+        self.name_label.setText(f"{self.name} (cancelling)")
+
+    def remove_self(self):
+        self.setParent(None)
+        self.deleteLater()
+
 
 class FigureItem(QWidget):
     def __init__(
-        self, name, gl_widget, index, parent_layout, main_window, centroid, vertices_np
+        self,
+        name,
+        gl_widget,
+        index,
+        parent_layout,
+        main_window,
+        centroid,
+        vertices_np,
+        indices_np=None,
     ):
         super().__init__()
         self.name = name
@@ -227,9 +323,19 @@ class FigureItem(QWidget):
         self.specular = [0.0, 0.0, 0.0, 0.0]  # odbicie zwierciadlane
 
         self.original_vertices = vertices_np
-        self.current_vertices = vertices_np.copy()
+        self.file_path = None  # the OBJ file and shading mode, kept for saved scenes
+        self.smooth = False
+        # computed once; world_bounds follows the transform without a vertex pass
+        self.bounds = Bounds.from_vertex_data(vertices_np, indices_np)
+        self.world_bounds = self.bounds
+        self.transform_entry = None  # the TransformCache entry the widget shows
+        self.gl_widget.set_bounding_sphere(
+            index, self.bounds.sphere_center, self.bounds.sphere_radius
+        )
+        # scale and rotation are applied around the mean of the triangle corners
+        self.pivot = tuple(float(c) for c in self.bounds.centroid)
 
-        self.params_in_frames = {}
+        self.params_in_frames = KeyframeTrack()
 
         layout = QHBoxLayout()
         self.name_button = QPushButton(name)
@@ -269,77 +375,30 @@ class FigureItem(QWidget):
         }
 
     def get_interpolated_params(self, frame_num):
-        keyframes = sorted(self.params_in_frames.keys())
-
-        if not keyframes:
+        if not self.params_in_frames:
             return self.get_default_transform_params()
-
-        if frame_num <= keyframes[0]:
-            return self.params_in_frames[keyframes[0]]
-        if frame_num >= keyframes[-1]:
-            return self.params_in_frames[keyframes[-1]]
-
-        prev_kf = keyframes[0]
-        next_kf = keyframes[-1]
-        for kf in keyframes:
-            if kf <= frame_num:
-                prev_kf = kf
-            if kf >= frame_num:
-                next_kf = kf
-                break
-
-        if prev_kf == next_kf:
-            return self.params_in_frames[prev_kf]
-
-        params1 = self.params_in_frames[prev_kf]
-        params2 = self.params_in_frames[next_kf]
-
-        segment_len = float(next_kf - prev_kf)
-        t = (frame_num - prev_kf) / segment_len
-
-        interp_p = {
-            "centroid": lerp_vec(params1["centroid"], params2["centroid"], t),
-            "size_x": lerp(params1["size_x"], params2["size_x"], t),
-            "size_y": lerp(params1["size_y"], params2["size_y"], t),
-            "size_z": lerp(params1["size_z"], params2["size_z"], t),
-            "rot_x": lerp(params1["rot_x"], params2["rot_x"], t),
-            "rot_y": lerp(params1["rot_y"], params2["rot_y"], t),
-            "rot_z": lerp(params1["rot_z"], params2["rot_z"], t),
-        }
-        return interp_p
+        return unpack(TRANSFORM_FIELDS, self.params_in_frames.interpolate(frame_num))
 
     def get_params_for_ui_display(self, frame_num_in_ui):
-        figure_keyframes = sorted(
-            [
-                k
-                for k in self.params_in_frames.keys()
-                if self.params_in_frames[k] is not None
-            ]
-        )
-
-        if not figure_keyframes:
+        if not self.params_in_frames:
             return self.get_default_transform_params()
-
-        if frame_num_in_ui in self.params_in_frames:
-            return self.params_in_frames[frame_num_in_ui]
-
-        if frame_num_in_ui < figure_keyframes[0]:
-            return self.params_in_frames[figure_keyframes[0]]
-
-        last_defined_kf_before_or_at_ui_frame = figure_keyframes[0]
-        for kf in figure_keyframes:
-            if kf <= frame_num_in_ui:
-                last_defined_kf_before_or_at_ui_frame = kf
-            else:
-                break
-
-        return self.params_in_frames[last_defined_kf_before_or_at_ui_frame]
+        # the keyframe at or before the frame, the first one for earlier frames
+        return self.params_in_frames.held(frame_num_in_ui)
+
+    def show_memory_stats(self, stats):
+        saved = stats["unindexed_bytes"] - stats["gpu_bytes"]
+        report = (
+            f"{stats['unique_vertices']} unique vertices for {stats['corners']} corners, "
+            f"GPU memory {stats['gpu_bytes'] / 1024:.1f} KB "
+            f"(saved {saved / 1024:.1f} KB)"
+        )
+        self.name_button.setToolTip(report)
+        print(f"{self.name}: {report}")
 
     def toggle_visibility(self):
         current_state = self.toggle_button.isChecked()
-        self.gl_widget.additional_visible_flags[self.index] = current_state
+        self.gl_widget.set_figure_visible(self.index, current_state)
         self.update_icon()
-        self.gl_widget.update()
 
     def on_name_button_clicked(self):
         self.display_figure_params()
@@ -359,6 +418,7 @@ class FigureItem(QWidget):
                 self.gl_widget.delete_model(index)
         except Exception as e:
             print(f"Delete error: {e}")
+        self.main_window.transform_cache.discard_figure(self)
         clear_layout(self.main_window.parameters_frame_area)
         clear_layout(self.main_window.parameters_object_area)
         self.main_window.param_frame_number.setText("Object in frame not chosen")
@@ -476,113 +536,6 @@ class FigureItem(QWidget):
         section_layout.addLayout(self.specular_box)
         section_layout.addWidget(self.apply_btn)
 
-    def apply_location(self, centroid, updated_vertices):
-        # 1. Oblicz obecny centroid
-        x_total, y_total, z_total = 0.0, 0.0, 0.0
-        count = 0
-
-        for i in range(0, len(updated_vertices), 6):
-            x_total += updated_vertices[i]
-            y_total += updated_vertices[i + 1]
-            z_total += updated_vertices[i + 2]
-            count += 1
-
-        current_centroid = (
-            x_total / count,
-            y_total / count,
-            z_total / count,
-        )
-
-        # 2. Oblicz przesunięcie
-        delta_x = centroid[0] - current_centroid[0]
-        delta_y = centroid[1] - current_centroid[1]
-        delta_z = centroid[2] - current_centroid[2]
-
-        # 3. Przesuń wszystkie wierzchołki
-        for i in range(0, len(updated_vertices), 6):
-            updated_vertices[i] += delta_x  # x
-            updated_vertices[i + 1] += delta_y  # y
-            updated_vertices[i + 2] += delta_z  # z
-
-    def apply_scale(self, scale_x, scale_y, scale_z, updated_vertices):
-        # 1. Oblicz centroid (środek figury)
-        x_total, y_total, z_total = 0.0, 0.0, 0.0
-        count = 0
-
-        for i in range(0, len(updated_vertices), 6):
-            x_total += updated_vertices[i]
-            y_total += updated_vertices[i + 1]
-            z_total += updated_vertices[i + 2]
-            count += 1
-
-        centroid_x = x_total / count
-        centroid_y = y_total / count
-        centroid_z = z_total / count
-
-        # 2–4. Przesuń -> Skaluj -> Przesuń z powrotem
-        for i in range(0, len(updated_vertices), 6):
-            # Przesuń do środka
-            x = updated_vertices[i] - centroid_x
-            y = updated_vertices[i + 1] - centroid_y
-            z = updated_vertices[i + 2] - centroid_z
-
-            # Skaluj
-            x *= scale_x
-            y *= scale_y
-            z *= scale_z
-
-            # Przesuń z powrotem
-            updated_vertices[i] = x + centroid_x
-            updated_vertices[i + 1] = y + centroid_y
-            updated_vertices[i + 2] = z + centroid_z
-
-    def apply_rotation(self, rot_x, rot_y, rot_z, updated_vertices):
-        # Konwersja stopnie -> radiany
-        rx = math.radians(rot_y)
-        ry = math.radians(rot_x)
-        rz = math.radians(rot_z)
-
-        # 1. Oblicz centroid
-        x_total, y_total, z_total = 0.0, 0.0, 0.0
-        count = 0
-
-        for i in range(0, len(updated_vertices), 6):
-            x_total += updated_vertices[i]
-            y_total += updated_vertices[i + 1]
-            z_total += updated_vertices[i + 2]
-            count += 1
-
-        centroid_x = x_total / count
-        centroid_y = y_total / count
-        centroid_z = z_total / count
-
-        # 2–4. Obracaj wierzchołki wokół centroidu
-        for i in range(0, len(updated_vertices), 6):
-            # Przesuń do układu lokalnego (centrum na 0,0,0)
-            x = updated_vertices[i] - centroid_x
-            y = updated_vertices[i + 1] - centroid_y
-            z = updated_vertices[i + 2] - centroid_z
-
-            # Obrót wokół X
-            y1 = y * math.cos(rx) - z * math.sin(rx)
-            z1 = y * math.sin(rx) + z * math.cos(rx)
-            y, z = y1, z1
-
-            # Obrót wokół Y
-            x1 = x * math.cos(ry) + z * math.sin(ry)
-            z1 = -x * math.sin(ry) + z * math.cos(ry)
-            x, z = x1, z1
-
-            # Obrót wokół Z
-            x1 = x * math.cos(rz) - y * math.sin(rz)
-            y1 = x * math.sin(rz) + y * math.cos(rz)
-            x, y = x1, y1
-
-            # Cofnij przesunięcie do globalnego układu
-            updated_vertices[i] = x + centroid_x
-            updated_vertices[i + 1] = y + centroid_y
-            updated_vertices[i + 2] = z + centroid_z
-
     def apply_figure_params(self):
         # Pobierz aktualny wybrany frame (jeśli brak, użyj 1)
         chosen_frame_number = self.main_window.get_chosen_frame()
@@ -639,19 +592,38 @@ class FigureItem(QWidget):
         except ValueError:
             print("Błąd: wprowadzone wartości muszą być liczbami")
 
-    def update_visual_state(self, frame_num_to_display_state_of):
-        params = self.get_params_for_ui_display(frame_num_to_display_state_of)
-
-        self.current_vertices = self.original_vertices.copy()
-        self.apply_scale(
-            params["size_x"], params["size_y"], params["size_z"], self.current_vertices
-        )
-        self.apply_rotation(
-            params["rot_x"], params["rot_y"], params["rot_z"], self.current_vertices
+    def set_transform(self, params):
+        # revisited parameters come ready-made from the cache, unchanged ones send nothing
+        cache = self.main_window.transform_cache
+        entry = cache.get(self, params)
+        if entry is not None and entry is self.transform_entry:
+            return
+        if entry is None:
+            # M = T(centroid) * Rz * Ry(rot_x) * Rx(rot_y) * S * T(-pivot)
+            matrix = transform_matrix(params, self.pivot)
+            model = QMatrix4x4(*matrix.ravel())
+            normal = model.normalMatrix()
+            entry = cache.put(
+                self,
+                params,
+                (
+                    model,
+                    normal,
+                    model_texels(model, normal),
+                    self.bounds.transformed(matrix),
+                ),
+            )
+        self.transform_entry = entry
+        model, normal, texels, self.world_bounds = entry
+        self.gl_widget.set_bounding_sphere(
+            self.index, self.world_bounds.sphere_center, self.world_bounds.sphere_radius
         )
-        self.apply_location(params["centroid"], self.current_vertices)
+        self.gl_widget.set_model_matrix(self.index, model, normal, texels)
 
-        self.gl_widget.updateModelVertices(self.index, self.current_vertices)
+    def update_visual_state(self, frame_num_to_display_state_of):
+        self.set_transform(
+            self.get_params_for_ui_display(frame_num_to_display_state_of)
+        )
 
     def validate_inputs(self):
         valid = all(
@@ -670,6 +642,7 @@ class FigureItem(QWidget):
         )
         self.apply_btn.setEnabled(valid)
 
+
 def clear_layout(layout):
     while layout.count():
         item = layout.takeAt(0)
@@ -682,21 +655,10 @@ def clear_layout(layout):
             if sub_layout is not None:
                 clear_layout(sub_layout)
 
+
 def is_valid_float(text):
     try:
         float(text)
         return True
     except ValueError:
         return False
-    
-def lerp(v0, v1, t):
-    return v0 * (1 - t) + v1 * t
-
-def lerp_vec(v0_tuple, v1_tuple, t):
-    if not isinstance(v0_tuple, (list, tuple)) or not isinstance(
-        v1_tuple, (list, tuple)
-    ):
-        return v0_tuple if v0_tuple is not None else v1_tuple
-    if len(v0_tuple) != len(v1_tuple):
-        return v0_tuple
-    return tuple(lerp(c0, c1, t) for c0, c1 in zip(v0_tuple, v1_tuple))
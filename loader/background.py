@@ -0,0 +1,77 @@
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from loader.obj_loader import load_obj_indexed
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+def load_model_geometry(file_path, mesh_cache, progress=None, smooth=False):
+    """Returns (vertex_data, indices, bbox_min, bbox_max), from the cache when possible.
+
+    Meshes are indexed when deduplicating their vertices saves memory, which is
+    usually the case for smooth shading; otherwise `indices` is None and
+    vertex_data holds three rows per triangle.
+    """
+    variant = "smooth" if smooth else ""
+    cached = mesh_cache.load(file_path, variant)
+    if cached is not None:
+        return cached
+
+    # data in the format: [x, y, z, nx, ny, nz]
+    vertex_data, indices, bbox_min, bbox_max = load_obj_indexed(
+        file_path, progress=progress, smooth=smooth
+    )
+    if len(vertex_data) == 0:
+        raise ValueError("Nie znaleziono poprawnych danych w pliku.")
+
+    mesh_cache.store(file_path, vertex_data, bbox_min, bbox_max, variant, indices)
+    return vertex_data, indices, bbox_min, bbox_max
+
+
+class ModelLoadSignals(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class ModelLoadTask(QRunnable):
+    """Parses one OBJ file on a QThreadPool worker.
+
+    Only the finished geometry crosses back to the GUI thread (through the
+    `finished` signal); the OpenGL upload stays with the caller.
+    """
+
+    def __init__(self, file_path, mesh_cache, smooth=False):
+        super().__init__()
+        self.file_path = file_path
+        self.mesh_cache = mesh_cache
+        self.smooth = smooth
+        self.signals = ModelLoadSignals()
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def report_progress(self, done, total):
+        if self._cancel_requested:
+            raise LoadCancelled()
+        self.signals.progress.emit(int(100 * done / max(1, total)))
+
+    def run(self):
+        try:
+            if self._cancel_requested:
+                raise LoadCancelled()
+            result = load_model_geometry(
+                self.file_path, self.mesh_cache, self.report_progress, self.smooth
+            )
+            if self._cancel_requested:
+                raise LoadCancelled()
+        except LoadCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
@@ -0,0 +1,114 @@
+import numpy as np
+
+TRIANGLE_BATCH = 1 << 16  # triangles expanded into the vertex buffer at once
+DEFAULT_NORMAL = (0.0, 0.0, 1.0)  # used for degenerate triangles
+
+
+def face_normals(vertices, triangles):
+    # one batched cross product for all triangles, computed in float64
+    corners = np.asarray(vertices, dtype=np.float64)[triangles]
+    return _normalized(
+        np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    )
+
+
+def vertex_normals(vertices, triangles):
+    """Area-weighted normals of the shared vertices (smooth shading).
+
+    The cross product of two triangle edges is twice the triangle area long,
+    so summing the raw cross products weighs every face by its area.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    triangles = np.asarray(triangles)
+    vertex_count = len(vertices)
+    accumulated = np.zeros((vertex_count, 3))
+    for start in range(0, len(triangles), TRIANGLE_BATCH):
+        batch = triangles[start : start + TRIANGLE_BATCH]
+        corners = vertices[batch]
+        weighted = np.cross(
+            corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]
+        )
+
+        # negative indices address from the end, like the fancy indexing above
+        targets = batch.ravel()
+        targets = np.where(targets < 0, targets + vertex_count, targets)
+        # scatter-add of every face normal to its three corners
+        np.add.at(accumulated, targets, np.repeat(weighted, 3, axis=0))
+    return _normalized(accumulated)
+
+
+def write_triangles(out, vertices, triangles, normals=None):
+    # out is a (len(triangles) * 3, 6) view of the final vertex buffer,
+    # normals are per vertex (smooth) or computed per face when None (flat)
+    out = out.reshape(len(triangles), 3, 6)
+    out[:, :, :3] = np.asarray(vertices)[triangles]
+    if normals is None:
+        out[:, :, 3:] = face_normals(vertices, triangles)[:, None, :]
+    else:
+        out[:, :, 3:] = normals[triangles]
+
+
+def _normalized(vectors):
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    degenerate = lengths[:, 0] == 0
+    lengths[degenerate] = 1.0
+    vectors = vectors / lengths
+    vectors[degenerate] = DEFAULT_NORMAL
+    return vectors
+
+
+def index_triangles(vertices, triangles, normals=None):
+    """Indexed [x, y, z, nx, ny, nz] buffer built from the compact mesh.
+
+    Two corners share a row when their positions and normals are the same
+    bytes. The keys come from the positions and the face normals (flat) or
+    `normals` (smooth), so the three-rows-per-triangle buffer is never built.
+    Unique rows keep the order of their first use and indices are uint16 when
+    they fit, uint32 otherwise. Returns (vertex_data, indices), or None for a
+    flat mesh whose face normals all differ: its triangles then share no rows
+    and the indexed buffer could only be larger.
+    """
+    vertices = np.asarray(vertices, dtype=np.float32)
+    triangles = np.asarray(triangles)
+    if len(triangles) == 0:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.uint32)
+
+    corners = triangles.ravel()
+    corners = np.where(corners < 0, corners + len(vertices), corners)
+    position_ids = _row_ids(vertices)[corners]
+    if normals is None:
+        unit = np.empty((len(triangles), 3), dtype=np.float32)
+        for start in range(0, len(triangles), TRIANGLE_BATCH):
+            batch = triangles[start : start + TRIANGLE_BATCH]
+            unit[start : start + len(batch)] = face_normals(vertices, batch)
+        normal_ids = _row_ids(unit)
+        degenerate = (unit == np.float32(DEFAULT_NORMAL)).all(axis=1).any()
+        if normal_ids.max() + 1 == len(triangles) and not degenerate:
+            return None
+        normal_ids = np.repeat(normal_ids, 3)
+    else:
+        unit = np.asarray(normals, dtype=np.float32)
+        normal_ids = _row_ids(unit)[corners]
+
+    keys = position_ids.astype(np.int64) * (normal_ids.max() + 1) + normal_ids
+    _, first_use, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    order = np.argsort(first_use)
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+
+    kept = first_use[order]
+    rows = np.empty((len(kept), 6), dtype=np.float32)
+    rows[:, :3] = vertices[corners[kept]]
+    rows[:, 3:] = unit[kept // 3] if normals is None else unit[corners[kept]]
+
+    index_type = np.uint16 if len(order) <= np.iinfo(np.uint16).max + 1 else np.uint32
+    indices = remap[inverse.ravel()].astype(index_type)
+    return rows.reshape(-1), indices
+
+
+def _row_ids(rows):
+    # the same id for byte-identical float32 rows of three values
+    rows = np.ascontiguousarray(rows, dtype=np.float32)
+    keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * 3))).ravel()
+    return np.unique(keys, return_inverse=True)[1].ravel()
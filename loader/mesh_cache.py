@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+CACHE_FORMAT_VERSION = 2
+DEFAULT_MAX_BYTES = 2 * 1024**3  # 2 GB
+VERTICES_SUFFIX = ".npy"
+INDICES_SUFFIX = ".indices.npy"
+META_SUFFIX = ".json"
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "animation-studio", "meshes")
+
+
+class MeshCache:
+    """On-disk cache of interleaved [x, y, z, nx, ny, nz] buffers.
+
+    Entries are plain .npy files (the vertex buffer and, for indexed meshes,
+    the index buffer), so a hit is served as read-only memory maps.
+    An entry is keyed by the absolute OBJ path plus its size and mtime; editing
+    the OBJ file makes the old entry unreachable and it is dropped on the next
+    store. Last access time is kept in the .npy mtime and the least recently
+    used entries are evicted once the cache grows over `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or os.environ.get(
+            "ANIMATION_STUDIO_CACHE", default_cache_dir()
+        )
+        self.max_bytes = max_bytes
+
+    def load(self, obj_path, variant=""):
+        """Returns (vertex_data, indices, bbox_min, bbox_max) or None on a miss.
+
+        `indices` is None for meshes stored without an index buffer.
+        """
+        try:
+            stat = os.stat(obj_path)
+            base = self._entry_base(obj_path, stat, variant)
+            data_path, meta_path = base + VERTICES_SUFFIX, base + META_SUFFIX
+            if not os.path.exists(data_path):
+                return None
+
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if (
+                meta.get("version") != CACHE_FORMAT_VERSION
+                or meta.get("size") != stat.st_size
+                or meta.get("mtime_ns") != stat.st_mtime_ns
+            ):
+                return None
+
+            vertex_data = np.load(data_path, mmap_mode="r")
+            indices = None
+            if meta.get("indexed"):
+                indices = np.load(base + INDICES_SUFFIX, mmap_mode="r")
+            os.utime(data_path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Mesh cache read failed for {obj_path}: {e}")
+            return None
+
+        bbox_min = np.array(meta["bbox_min"], dtype=np.float32)
+        bbox_max = np.array(meta["bbox_max"], dtype=np.float32)
+        return vertex_data, indices, bbox_min, bbox_max
+
+    def store(
+        self, obj_path, vertex_data, bbox_min, bbox_max, variant="", indices=None
+    ):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            stat = os.stat(obj_path)
+            self._drop_stale_entries(obj_path, stat, variant)
+            base = self._entry_base(obj_path, stat, variant)
+            data_path, meta_path = base + VERTICES_SUFFIX, base + META_SUFFIX
+
+            meta = {
+                "version": CACHE_FORMAT_VERSION,
+                "source": os.path.abspath(obj_path),
+                "variant": variant,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "bbox_min": [float(c) for c in bbox_min],
+                "bbox_max": [float(c) for c in bbox_max],
+                "indexed": indices is not None,
+            }
+            # write to unique temporary files first so neither a crash nor a
+            # second loader storing the same OBJ leaves a torn entry
+            if indices is not None:
+                indices_tmp = self._write_temporary(
+                    lambda f: np.save(f, np.ascontiguousarray(indices))
+                )
+                os.replace(indices_tmp, base + INDICES_SUFFIX)
+            data_tmp = self._write_temporary(
+                lambda f: np.save(
+                    f, np.ascontiguousarray(vertex_data, dtype=np.float32)
+                )
+            )
+            meta_tmp = self._write_temporary(
+                lambda f: f.write(json.dumps(meta).encode())
+            )
+            os.replace(meta_tmp, meta_path)
+            os.replace(data_tmp, data_path)
+
+            self.evict()
+        except (OSError, ValueError) as e:
+            print(f"Mesh cache write failed for {obj_path}: {e}")
+
+    def _write_temporary(self, write):
+        fd, path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    def evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for base, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            self._remove(base)
+            total -= size
+
+    def clear(self):
+        for base, _, _ in self._entries():
+            self._remove(base)
+
+    def total_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        # (base path, bytes on disk, last use) of every complete entry
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(VERTICES_SUFFIX) or name.endswith(INDICES_SUFFIX):
+                continue
+            base = os.path.join(self.cache_dir, name[: -len(VERTICES_SUFFIX)])
+            try:
+                stat = os.stat(base + VERTICES_SUFFIX)
+            except OSError:
+                continue
+            size = stat.st_size
+            if os.path.exists(base + INDICES_SUFFIX):
+                size += os.path.getsize(base + INDICES_SUFFIX)
+            entries.append((base, size, stat.st_mtime))
+        return entries
+
+    def _entry_base(self, obj_path, stat, variant):
+        prefix = self._path_prefix(obj_path, variant)
+        stamp = _digest(f"{stat.st_size}|{stat.st_mtime_ns}")
+        return os.path.join(self.cache_dir, f"{prefix}-{stamp}")
+
+    def _path_prefix(self, obj_path, variant):
+        return _digest(f"{os.path.abspath(obj_path)}|{variant}")
+
+    def _drop_stale_entries(self, obj_path, stat, variant):
+        prefix = self._path_prefix(obj_path, variant) + "-"
+        current = self._entry_base(obj_path, stat, variant)
+        for base, _, _ in self._entries():
+            if os.path.basename(base).startswith(prefix) and base != current:
+                self._remove(base)
+
+    def _remove(self, base):
+        for suffix in (VERTICES_SUFFIX, INDICES_SUFFIX, META_SUFFIX):
+            try:
+                os.remove(base + suffix)
+            except OSError:
+                pass
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
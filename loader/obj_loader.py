@@ -1,3 +1,25 @@
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from loader.geometry import (
+    TRIANGLE_BATCH,
+    index_triangles,
+    vertex_normals,
+    write_triangles,
+)
+
+DEFAULT_CHUNK_SIZE = 16 * 1024**2  # bytes of OBJ text parsed at once
+
+_V, _F = ord("v"), ord("f")
+_NEWLINE, _SPACE, _TAB, _SLASH = ord("\n"), ord(" "), ord("\t"), ord("/")
+_VERTEX_TABLE = bytes.maketrans(b"v", b" ")
+_FACE_TABLE = bytes.maketrans(b"f/", b"  ")
+
+
 def load_obj(filename):
     vertices = []
     faces = []
@@ -37,3 +59,415 @@ def load_obj(filename):
         print(f"An error occurred while loading the file: {e}")
         return [], []
     return vertices, faces
+
+
+def load_obj_arrays(filename):
+    """Bulk variant of load_obj.
+
+    Reads the whole file at once and converts the `v`/`f` records with NumPy.
+    Returns (vertices, faces) as contiguous float32 (N, 3) and int32 (M, 3)
+    arrays, triangulated the same way as load_obj.
+    """
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        print(f"Error: File not found at {filename}")
+        return _empty_arrays()
+    except Exception as e:
+        print(f"An error occurred while loading the file: {e}")
+        return _empty_arrays()
+
+    return parse_obj_buffer(data)
+
+
+def load_obj_streaming(
+    filename, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, smooth=False
+):
+    """Builds the [x, y, z, nx, ny, nz] vertex buffer straight from the file.
+
+    The file is parsed `chunk_size` bytes at a time and only the compact
+    positions and triangle indices are kept; triangles are then written batch
+    by batch into one preallocated float32 array, with face normals or, with
+    `smooth`, area-weighted vertex normals. Peak memory
+    stays close to the size of that array. `progress(done, total)` is called
+    with the number of bytes processed so far.
+    Returns (vertex_data, bbox_min, bbox_max).
+    """
+    mesh = _read_mesh(filename, chunk_size, progress)
+    if mesh is None:
+        return np.empty(0, dtype=np.float32), np.zeros(3), np.zeros(3)
+    vertices, triangles, bbox_min, bbox_max = mesh
+    normals = vertex_normals(vertices, triangles) if smooth else None
+    return _expand(vertices, triangles, normals), bbox_min, bbox_max
+
+
+def load_obj_indexed(
+    filename, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, smooth=False
+):
+    """Variant of load_obj_streaming that indexes the mesh when that saves memory.
+
+    Shared vertices are found on the compact mesh with index_triangles, so
+    the expanded buffer is only built for meshes that stay unindexed.
+    Returns (vertex_data, indices, bbox_min, bbox_max); `indices` is None
+    when vertex_data holds three rows per triangle.
+    """
+    mesh = _read_mesh(filename, chunk_size, progress)
+    if mesh is None:
+        return np.empty(0, dtype=np.float32), None, np.zeros(3), np.zeros(3)
+    vertices, triangles, bbox_min, bbox_max = mesh
+    normals = vertex_normals(vertices, triangles) if smooth else None
+
+    indexed = index_triangles(vertices, triangles, normals)
+    if indexed is not None:
+        vertex_data, indices = indexed
+        if vertex_data.nbytes + indices.nbytes < len(triangles) * 18 * 4:
+            return vertex_data, indices, bbox_min, bbox_max
+    return _expand(vertices, triangles, normals), None, bbox_min, bbox_max
+
+
+def _read_mesh(filename, chunk_size, progress):
+    # (vertices, triangles, bbox_min, bbox_max), or None when the file can't be read
+    try:
+        total = os.path.getsize(filename)
+        vertices, triangles = _read_chunks(filename, chunk_size, total, progress)
+    except FileNotFoundError:
+        print(f"Error: File not found at {filename}")
+        return None
+    except OSError as e:
+        print(f"An error occurred while loading the file: {e}")
+        return None
+
+    if progress is not None:
+        progress(total, total)
+    if len(vertices) == 0:
+        return vertices, triangles, np.zeros(3), np.zeros(3)
+    return vertices, triangles, vertices.min(axis=0), vertices.max(axis=0)
+
+
+def _expand(vertices, triangles, normals):
+    # three rows per triangle, written batch by batch into one float32 array
+    vertex_data = np.empty(len(triangles) * 18, dtype=np.float32)
+    rows = vertex_data.reshape(-1, 6)
+    for start in range(0, len(triangles), TRIANGLE_BATCH):
+        batch = triangles[start : start + TRIANGLE_BATCH]
+        write_triangles(
+            rows[3 * start : 3 * (start + len(batch))], vertices, batch, normals
+        )
+    return vertex_data
+
+
+def _read_chunks(filename, chunk_size, total, progress):
+    vertex_parts = []
+    face_parts = []
+    vertex_count = 0
+    done = 0
+    tail = b""
+    with open(filename, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            data = tail + chunk
+            if chunk:
+                # parse whole lines only, the rest waits for the next chunk
+                cut = data.rfind(b"\n") + 1
+                data, tail = data[:cut], data[cut:]
+            if data:
+                vertices, faces = parse_obj_buffer(data, vertex_count)
+                vertex_parts.append(vertices)
+                face_parts.append(faces)
+                vertex_count += len(vertices)
+            if not chunk:
+                break
+            done += len(chunk)
+            if progress is not None:
+                progress(done, total)
+
+    vertices, triangles = _empty_arrays()
+    if vertex_parts:
+        vertices = np.concatenate(vertex_parts)
+    if face_parts:
+        triangles = np.concatenate(face_parts)
+    return vertices, triangles
+
+
+def load_obj_parallel(filename, workers=None):
+    """Parallel variant of load_obj_arrays.
+
+    The file is split at line boundaries into one byte range per worker and
+    every range is parsed in its own process. Workers hand their arrays back
+    through shared memory; face indices are then shifted by the number of
+    vertices defined in earlier ranges.
+    """
+    workers = workers or os.cpu_count() or 1
+    try:
+        ranges = _split_byte_ranges(filename, workers)
+    except FileNotFoundError:
+        print(f"Error: File not found at {filename}")
+        return _empty_arrays()
+    except OSError as e:
+        print(f"An error occurred while loading the file: {e}")
+        return _empty_arrays()
+    if len(ranges) <= 1:
+        return load_obj_arrays(filename)
+
+    # workers must share our resource tracker, otherwise each of them unlinks
+    # its shared memory blocks when it exits
+    resource_tracker.ensure_running()
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        parts = list(pool.map(_parse_byte_range, [(filename, a, b) for a, b in ranges]))
+
+    vertex_counts = [part["vertices"][1][0] for part in parts]
+    face_counts = [part["faces"][1][0] for part in parts]
+    vertices = np.empty((sum(vertex_counts), 3), dtype=np.float32)
+    faces = np.empty((sum(face_counts), 3), dtype=np.int32)
+
+    vertex_base = 0
+    face_base = 0
+    for part, vertex_count, face_count in zip(parts, vertex_counts, face_counts):
+        target = vertices[vertex_base : vertex_base + vertex_count]
+        _take_shared(part["vertices"], target)
+
+        target = faces[face_base : face_base + face_count]
+        _take_shared(part["faces"], target)
+        if part["relative"] is not None:
+            relative = np.empty((face_count, 3), dtype=bool)
+            _take_shared(part["relative"], relative)
+            target[relative] += vertex_base
+        # positive OBJ indices are absolute already
+
+        vertex_base += vertex_count
+        face_base += face_count
+    return vertices, faces
+
+
+def _split_byte_ranges(filename, parts):
+    size = os.path.getsize(filename)
+    bounds = [0]
+    with open(filename, "rb") as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, bounds[-1]))
+            f.readline()  # move to the start of the next line
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _parse_byte_range(args):
+    # runs in a worker process
+    filename, start, end = args
+    with open(filename, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    vertices, faces, relative = parse_obj_buffer(data, with_relative=True)
+    return {
+        "vertices": _to_shared(vertices),
+        "faces": _to_shared(faces),
+        "relative": None if relative is None else _to_shared(relative),
+    }
+
+
+def _to_shared(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    shm.close()
+    return shm.name, array.shape, array.dtype.str
+
+
+def _take_shared(handle, out):
+    name, shape, dtype = handle
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        out[...] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def parse_obj_buffer(data, vertex_base=0, with_relative=False):
+    """Parses a block of complete OBJ lines.
+
+    `vertex_base` is the number of vertices that precede the block in the
+    file; it is needed to resolve negative (relative) face indices. With
+    `with_relative` a third value is returned: a bool mask of the face
+    corners that were given as relative indices (or None if there were
+    none), so a caller that did not know `vertex_base` can shift them later.
+    """
+    vertex_parts = []
+    face_parts = []
+    relative_parts = []
+    defined = vertex_base
+    for kind, start, end, count in _record_runs(data):
+        block = data[start:end]
+        if kind == _V:
+            vertices = _parse_vertex_block(block, count)
+            vertex_parts.append(vertices)
+            defined += len(vertices)
+        else:
+            faces, relative_faces = _parse_face_block(block, count, defined)
+            face_parts.append(faces)
+            relative_parts.append(relative_faces)
+
+    vertices, faces = _empty_arrays()
+    if vertex_parts:
+        vertices = np.concatenate(vertex_parts)
+    if face_parts:
+        faces = np.concatenate(face_parts)
+    if not with_relative:
+        return vertices, faces
+
+    relative_faces = None
+    if any(part is not None for part in relative_parts):
+        relative_faces = np.concatenate(
+            [
+                np.zeros(f.shape, dtype=bool) if part is None else part
+                for f, part in zip(face_parts, relative_parts)
+            ]
+        )
+    return vertices, faces, relative_faces
+
+
+def _empty_arrays():
+    return np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.int32)
+
+
+def _record_runs(data):
+    # Consecutive lines of the same kind (v or f) are converted as one block
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if buf.size == 0:
+        return []
+    line_starts = np.concatenate(([0], np.flatnonzero(buf == _NEWLINE) + 1))
+    line_starts = line_starts[line_starts < buf.size]
+
+    first = buf[line_starts]
+    second = buf[np.minimum(line_starts + 1, buf.size - 1)]
+    separated = (second == _SPACE) | (second == _TAB)
+    kinds = np.where(separated & (first == _V), _V, 0)
+    kinds = np.where(separated & (first == _F), _F, kinds)
+
+    bounds = np.concatenate(
+        ([0], np.flatnonzero(kinds[1:] != kinds[:-1]) + 1, [kinds.size])
+    )
+    offsets = np.append(line_starts, buf.size)[bounds].tolist()
+    run_kinds = kinds[bounds[:-1]].tolist()
+    run_lines = np.diff(bounds).tolist()
+    return [
+        (kind, offsets[i], offsets[i + 1], run_lines[i])
+        for i, kind in enumerate(run_kinds)
+        if kind
+    ]
+
+
+def _parse_vertex_block(block, count):
+    text = block.translate(_VERTEX_TABLE)
+    values = _fromstring(text, np.float32)
+
+    # the block is a table only if every line has the same number of values
+    buf = np.frombuffer(text, dtype=np.uint8)
+    blank = buf <= _SPACE
+    number_starts = np.flatnonzero(blank[:-1] & ~blank[1:]) + 1
+    line_of_number = np.searchsorted(np.flatnonzero(buf == _NEWLINE), number_starts)
+    numbers_per_line = np.bincount(line_of_number, minlength=count)
+    width = int(numbers_per_line[0])
+    if (
+        width >= 3
+        and values.size == number_starts.size
+        and (numbers_per_line == width).all()
+    ):
+        return np.ascontiguousarray(values.reshape(count, width)[:, :3])
+
+    # Malformed lines, go record by record.
+    vertices = []
+    for line in block.splitlines():
+        try:
+            vertex = [float(p) for p in line.split()[1:4]]
+        except ValueError:
+            print(
+                f"Skipping malformed vertex line: {line.strip().decode(errors='replace')}"
+            )
+            continue
+        if len(vertex) == 3:
+            vertices.append(vertex)
+    return np.array(vertices, dtype=np.float32).reshape(-1, 3)
+
+
+def _parse_face_block(block, count, defined):
+    indices, counts = _face_indices(block, count)
+
+    indices -= 1
+    # OBJ index -n refers to the n-th vertex defined before the face line
+    relative = indices < -1
+    indices[relative] += defined + 1
+
+    # Fan triangulation (f0, fi, fi+1), faces with fewer than 3 indices are dropped
+    valid = counts >= 3
+    starts = (np.cumsum(counts) - counts)[valid]
+    fan = counts[valid] - 2
+    first = np.repeat(starts, fan)
+    offsets = np.arange(fan.sum()) - np.repeat(np.cumsum(fan) - fan, fan) + 1
+
+    corners = (first, first + offsets, first + offsets + 1)
+    faces = np.empty((first.size, 3), dtype=np.int32)
+    for i, corner in enumerate(corners):
+        faces[:, i] = indices[corner]
+
+    relative_faces = None
+    if relative.any():
+        relative_faces = np.column_stack([relative[corner] for corner in corners])
+    return faces, relative_faces
+
+
+def _face_indices(block, count):
+    # "v/vt/vn" tokens become k numbers, k taken from the first token of the
+    # block; every line has to match that layout in numbers and in slashes
+    token = block.split(None, 2)[1]
+    numbers_per_token = len([p for p in token.split(b"/") if p])
+    slashes_per_token = token.count(b"/")
+
+    text = block.translate(_FACE_TABLE)
+    numbers = _fromstring(text, np.int64)
+
+    buf = np.frombuffer(text, dtype=np.uint8)
+    blank = buf <= _SPACE
+    number_starts = np.flatnonzero(blank[:-1] & ~blank[1:]) + 1
+    line_ends = np.flatnonzero(buf == _NEWLINE)
+    line_of_number = np.searchsorted(line_ends, number_starts)
+    numbers_per_line = np.bincount(line_of_number, minlength=count)
+    slashes = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == _SLASH)
+    slashes_per_line = np.bincount(np.searchsorted(line_ends, slashes), minlength=count)
+
+    counts = numbers_per_line // numbers_per_token
+    if (
+        numbers.size == number_starts.size
+        and not (numbers_per_line % numbers_per_token).any()
+        and np.array_equal(slashes_per_line, counts * slashes_per_token)
+    ):
+        return numbers[::numbers_per_token].copy(), counts
+
+    return _parse_faces_per_record(block.splitlines())
+
+
+def _fromstring(text, dtype):
+    # A malformed token stops the conversion early (older NumPy) or raises,
+    # callers compare the sizes and fall back to the per-record parser
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            return np.fromstring(text, dtype=dtype, sep=" ")
+    except ValueError:
+        return np.empty(0, dtype=dtype)
+
+
+def _parse_faces_per_record(lines):
+    indices = []
+    counts = []
+    for line in lines:
+        try:
+            face = [int(p.split(b"/")[0]) for p in line.split()[1:]]
+        except ValueError:
+            print(
+                f"Skipping malformed face line: {line.strip().decode(errors='replace')}"
+            )
+            face = []
+        indices.extend(face)
+        counts.append(len(face))
+    return np.array(indices, dtype=np.int64), np.array(counts, dtype=np.int64)
@@ -7,34 +7,40 @@ from PyQt5.QtWidgets import (
     QLabel,
     QLineEdit,
     QScrollArea,
+    QSpinBox,
     QFileDialog,
     QMessageBox,
     QGroupBox,
     QInputDialog,
+    QCheckBox,
 )
 from PyQt5.QtGui import (
     QVector3D,
     QImage,
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThreadPool
+from bisect import insort
 import numpy as np
 import sys
 import imageio.v2 as iio
 
-from loader.obj_loader import load_obj
-from items import LightItem, FigureItem
-from my_gl_widget import MyGLWidget
+from loader.background import ModelLoadTask
+from loader.mesh_cache import MeshCache
+from utils.scene import save_scene
+from utils.keyframes import LIGHT_FIELDS
+from utils.light_clusters import default_light_range
+from utils.timeline import TimelineBake, light_defaults, params_from_row
+from utils.transform_cache import TransformCache
+from items import LightItem, FigureItem, LoadingItem
+from my_gl_widget import MAX_LIGHTS, MyGLWidget
+from timeline_widget import TimelineWidget
 from utils.styles import (
     pressed_button_style,
     std_border_style,
     camera_controls_group_style,
 )
 
-phong_vert = "shaders/phong.vert"
-phong_frag = "shaders/phong.frag"
-
-
-
+MAX_FRAME_COUNT = 1_000_000
 
 
 class MainWindow(QWidget):
@@ -43,6 +49,12 @@ class MainWindow(QWidget):
         self.setWindowTitle("Program do animacji")
 
         self.lights_ever = 0
+        self.mesh_cache = MeshCache()
+        self.transform_cache = TransformCache()
+        self.timeline = TimelineBake()
+        self.light_timeline = TimelineBake(LIGHT_FIELDS, light_defaults)
+        self.load_pool = QThreadPool(self)
+        self.loading_items = []
 
         # two main sections
         self.objects_gl_editor_widget = QWidget()
@@ -81,7 +93,12 @@ class MainWindow(QWidget):
         self.figure_add.clicked.connect(self.load_model)
         self.figure_add.setStyleSheet(pressed_button_style)
 
+        # shading of newly loaded figures
+        self.smooth_shading_checkbox = QCheckBox("Smooth")
+        self.smooth_shading_checkbox.setStyleSheet("border: none;")
+
         self.figure_title_row.addWidget(self.figure_label)
+        self.figure_title_row.addWidget(self.smooth_shading_checkbox)
         self.figure_title_row.addWidget(self.figure_add)
         self.helper_figure_title.setLayout(self.figure_title_row)
         # figures scrollable box
@@ -99,6 +116,8 @@ class MainWindow(QWidget):
         self.helper_figure_box.setLayout(self.figure_box)
         self.figure_scroll.setWidgetResizable(True)
         self.figure_scroll.setWidget(self.helper_figure_box)
+        # models that are still being loaded in the background
+        self.loading_box = QVBoxLayout()
 
         # lights title
         self.helper_lights_title = QWidget()
@@ -131,6 +150,7 @@ class MainWindow(QWidget):
         self.objects_layout.addWidget(self.helper_ambient, stretch=1)
         self.objects_layout.addWidget(self.helper_figure_title, stretch=2)
         self.objects_layout.addWidget(self.figure_scroll, stretch=10)
+        self.objects_layout.addLayout(self.loading_box)
         self.objects_layout.addWidget(self.helper_lights_title, stretch=2)
         self.objects_layout.addWidget(self.lights_scroll, stretch=10)
 
@@ -150,8 +170,22 @@ class MainWindow(QWidget):
         self.reset_camera_button.clicked.connect(self.reset_camera_view)
         self.reset_camera_button.setStyleSheet(pressed_button_style)
 
+        self.fps_label = QLabel("FPS: 0")
+        self.gl_widget.scheduler.fps_changed.connect(self.show_render_stats)
+
+        self.profiler_checkbox = QCheckBox("Profiler")
+        self.profiler_checkbox.toggled.connect(self.gl_widget.set_profiling)
+        self.profiler_csv_button = QPushButton("CSV")
+        self.profiler_csv_button.clicked.connect(self.export_profile)
+        self.batching_checkbox = QCheckBox("Batching")
+        self.batching_checkbox.toggled.connect(self.gl_widget.set_batching)
+
         self.camera_controls_layout.addWidget(self.move_camera_button)
         self.camera_controls_layout.addWidget(self.reset_camera_button)
+        self.camera_controls_layout.addWidget(self.fps_label)
+        self.camera_controls_layout.addWidget(self.profiler_checkbox)
+        self.camera_controls_layout.addWidget(self.profiler_csv_button)
+        self.camera_controls_layout.addWidget(self.batching_checkbox)
         self.camera_controls_group.setLayout(self.camera_controls_layout)
 
         # parameters of an object
@@ -189,45 +223,34 @@ class MainWindow(QWidget):
         self.delete_frame_btn.clicked.connect(self.delete_frame)
         self.delete_frame_btn.setStyleSheet(pressed_button_style)
         self.frame_number = QLabel("Frame #")
+        self.frame_count_label = QLabel("Frames:")
+        self.frame_count_input = QSpinBox()
+        self.frame_count_input.setRange(1, MAX_FRAME_COUNT)
+        self.frame_count_input.setValue(100)
+        self.frame_count_input.editingFinished.connect(self.set_frame_count)
         self.download = QPushButton("Download film")
         self.download.clicked.connect(self.generate_animation_movie)
         self.download.setStyleSheet(pressed_button_style)
+        self.save_scene_btn = QPushButton("Save scene")
+        self.save_scene_btn.clicked.connect(self.save_scene_file)
+        self.save_scene_btn.setStyleSheet(pressed_button_style)
         self.animation_header_layout.addWidget(self.animation_label)
         self.animation_header_layout.addWidget(self.add_frame_btn)
         self.animation_header_layout.addWidget(self.delete_frame_btn)
         self.animation_header_layout.addWidget(self.frame_number)
+        self.animation_header_layout.addWidget(self.frame_count_label)
+        self.animation_header_layout.addWidget(self.frame_count_input)
         self.animation_header_layout.addWidget(self.download)
+        self.animation_header_layout.addWidget(self.save_scene_btn)
         self.helper_animation_header.setLayout(self.animation_header_layout)
 
-        self.animation_frames_scroll_area = QScrollArea()
-        self.animation_frames_scroll_area.setWidgetResizable(True)
-        self.animation_frames_scroll_area.setHorizontalScrollBarPolicy(
-            Qt.ScrollBarPolicy.ScrollBarAlwaysOn
-        )
-        self.animation_frames_scroll_area.setVerticalScrollBarPolicy(
-            Qt.ScrollBarPolicy.ScrollBarAlwaysOff
-        )
-
-        self.animation_frames_container = QWidget()
-        self.animation_frames_layout_internal = QHBoxLayout(
-            self.animation_frames_container
-        )
-        self.animation_frames_layout_internal.setContentsMargins(0, 0, 0, 0)
-        self.animation_frames_layout_internal.setSpacing(2)
-
-        self.frame_buttons = []
-        for i in range(100):
-            btn = QPushButton(f"{i+1}")
-            btn.setFixedSize(40, 40)
-            btn.clicked.connect(lambda checked=False, n=i + 1: self.frame_chosen(n))
-            self.animation_frames_layout_internal.addWidget(btn)
-            self.frame_buttons.append(btn)
-        self.frame_numbers = []
-
-        self.animation_frames_scroll_area.setWidget(self.animation_frames_container)
+        self.timeline_view = TimelineWidget(frame_count=100)
+        self.timeline_view.frame_clicked.connect(self.frame_chosen)
+        self.frame_numbers = []  # sorted
+        self.timeline_view.set_keyframes(self.frame_numbers)
 
         _layout_for_helper_animation_frames = QVBoxLayout(self.helper_animation_frames)
-        _layout_for_helper_animation_frames.addWidget(self.animation_frames_scroll_area)
+        _layout_for_helper_animation_frames.addWidget(self.timeline_view)
 
         # add to animation layout
         self.animation_layout.addWidget(self.helper_animation_header)
@@ -269,20 +292,17 @@ class MainWindow(QWidget):
                 figure_widget = figure.widget()
                 if isinstance(figure_widget, FigureItem):
                     figure_widget.params_in_frames.pop(chosen_frame_number)
-            # TODO usuwanie klatki ze słowników obiektów świateł
+            for light_item in self.get_lights():
+                light_item.params_in_frames.pop(chosen_frame_number, None)
             self.frame_numbers.remove(chosen_frame_number)
-            button = self.animation_frames_layout_internal.itemAt(
-                chosen_frame_number - 1
-            ).widget()
-            button.setStyleSheet("background-color: none;")
+            self.timeline_view.set_keyframes(self.frame_numbers)
 
     def add_frame(self):
         chosen_frame_number = self.get_chosen_frame()
         if (
             chosen_frame_number != -1 and chosen_frame_number not in self.frame_numbers
         ):  # we do nothing if there is already frame inside
-            self.frame_numbers.append(chosen_frame_number)
-            self.frame_numbers.sort()
+            insort(self.frame_numbers, chosen_frame_number)
             for i in range(self.figure_box.count()):
                 figure = self.figure_box.itemAt(i)
                 figure_widget = figure.widget()
@@ -291,36 +311,30 @@ class MainWindow(QWidget):
                         chosen_frame_number
                     )
                     set_frame_to_figure(figure_widget, chosen_frame_number, params)
-            # TODO dodawanie klatki do słowników obiektów świateł
+            for light_item in self.get_lights():
+                light_item.params_in_frames[chosen_frame_number] = (
+                    light_item.get_params_for_ui_display(chosen_frame_number)
+                )
             # pokoloruj klatkę jeśli jest pełna
-            button = self.animation_frames_layout_internal.itemAt(
-                chosen_frame_number - 1
-            ).widget()
-            button.setStyleSheet("background-color: lightblue; border: 4px solid red;")
+            self.timeline_view.set_keyframes(self.frame_numbers)
 
     def frame_chosen(self, number):
         self.chosen_frame_number = number
         self.frame_number.setText(f"Frame #{number}")
-
-        for i, btn in enumerate(self.frame_buttons):
-            is_keyframe_for_animation = (i + 1) in self.frame_numbers
-            if (i + 1) == number and is_keyframe_for_animation:
-                btn.setStyleSheet("background-color: lightblue; border: 4px solid red;")
-            elif (i + 1) == number:
-                btn.setStyleSheet("border: 4px solid red;")
-            elif is_keyframe_for_animation:
-                btn.setStyleSheet("background-color: lightblue;")
-            else:
-                btn.setStyleSheet("")
+        self.timeline_view.set_chosen_frame(number)
 
         print(f"CHOSEN FRAME: {number}")
 
+        # the preview holds the keyframe at or before the frame, the values the
+        # parameter fields edit, so it stays off the interpolated timeline bake
         for i in range(self.figure_box.count()):
             figure_widget_item = self.figure_box.itemAt(i).widget()
             if isinstance(figure_widget_item, FigureItem):
                 figure_widget_item.update_visual_state(number)
+        for light_item in self.get_lights():
+            light_item.update_visual_state(number)
 
-        self.gl_widget.update()
+        self.gl_widget.request_frame()
 
         if self.chosen_figure_item:
             print(f"AKTYWNA FIGURA: {self.chosen_figure_item.name}")
@@ -328,50 +342,79 @@ class MainWindow(QWidget):
         else:
             print("Nie znaleziono zaznaczonej figury.")
 
+    def show_render_stats(self, fps):
+        self.fps_label.setText(
+            f"FPS: {fps:.0f}  drawn: {self.gl_widget.figures_drawn}"
+            f"  culled: {self.gl_widget.figures_culled}"
+            f"  transforms cached: {self.transform_cache.stats()['hit_rate']:.0%}"
+        )
+
+    def export_profile(self):
+        if not self.gl_widget.profiler.history:
+            print("Brak pomiarów, włącz profiler")
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save profile", "", "CSV Files (*.csv)"
+        )
+        if not path:
+            return
+        if not path.endswith(".csv"):
+            path += ".csv"
+        self.gl_widget.profiler.write_csv(path)
+        print(f"Zapisano {len(self.gl_widget.profiler.history)} klatek do {path}")
+
     def reset_camera_view(self):
         self.gl_widget.camera.reset_state()
-        self.gl_widget.update()
+        self.gl_widget.request_frame()
 
     def load_model(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Choose OBJ file", "", "OBJ Files (*.obj)"
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Choose OBJ files", "", "OBJ Files (*.obj)"
         )
-        if not file_path:
-            return  # user canceled action
-
-        try:
-            vertices_list, faces = load_obj(file_path)
-            if not vertices_list or not faces:
-                raise ValueError("Nie znaleziono poprawnych danych w pliku.")
-
-            # Calculate normals and prepare data in the format: [x, y, z, nx, ny, nz]
-            vertex_data = []
-            for face in faces:
-                v0 = np.array(vertices_list[face[0]])
-                v1 = np.array(vertices_list[face[1]])
-                v2 = np.array(vertices_list[face[2]])
-
-                # normal for triangle
-                normal = np.cross(v1 - v0, v2 - v0)
-                normal = (
-                    normal / np.linalg.norm(normal)
-                    if np.linalg.norm(normal) > 0
-                    else np.array([0.0, 0.0, 1.0])
+        # user canceled action when the list is empty
+        for file_path in file_paths:
+            smooth = self.smooth_shading_checkbox.isChecked()
+            task = ModelLoadTask(file_path, self.mesh_cache, smooth)
+            loading_item = LoadingItem(file_path.split("/")[-1], task)
+            task.signals.finished.connect(
+                lambda result, p=file_path, item=loading_item, s=smooth: self.on_model_loaded(
+                    p, item, result, s
                 )
+            )
+            task.signals.failed.connect(
+                lambda message, item=loading_item: self.on_model_load_failed(
+                    item, message
+                )
+            )
+            task.signals.cancelled.connect(
+                lambda item=loading_item: self.finish_loading(item)
+            )
+            self.loading_box.addWidget(loading_item)
+            self.loading_items.append(loading_item)
+            self.load_pool.start(task)
+
+    def finish_loading(self, loading_item):
+        if loading_item in self.loading_items:
+            self.loading_items.remove(loading_item)
+        self.loading_box.removeWidget(loading_item)
+        loading_item.remove_self()
 
-                for idx in face[:3]:  # triangles are assumed
-                    pos = vertices_list[idx]
-                    vertex_data.extend([*pos, *normal])
+    def on_model_load_failed(self, loading_item, message):
+        self.finish_loading(loading_item)
+        QMessageBox.critical(self, "Błąd", f"Nie udało się wczytać modelu:\n{message}")
 
-            vertices_np = np.array(vertex_data, dtype=np.float32)
+    def on_model_loaded(self, file_path, loading_item, result, smooth=False):
+        self.finish_loading(loading_item)
+        vertices_np, indices_np, bbox_min, bbox_max = result
 
-            self.gl_widget.loadModel(vertices_np)
+        try:
+            self.gl_widget.loadModel(vertices_np, indices_np)
 
             # Add figure name to scrollbox:
             file_name = file_path.split("/")[-1]
             index = len(self.gl_widget.additional_vaos) - 1  # Ostatni dodany
 
-            centroid, size_x, size_y, size_z = get_model_parameters(vertices_list)
+            centroid, size_x, size_y, size_z = get_model_parameters(bbox_min, bbox_max)
             figure_item = FigureItem(
                 file_name,
                 self.gl_widget,
@@ -380,7 +423,12 @@ class MainWindow(QWidget):
                 self,
                 centroid,
                 vertices_np,
+                indices_np,
             )
+            figure_item.show_memory_stats(self.gl_widget.additional_memory_stats[index])
+            # where the geometry came from, for saved scenes
+            figure_item.file_path = file_path
+            figure_item.smooth = smooth
             for frame in self.frame_numbers:
                 set_frame_to_figure(figure_item, frame)
             self.figure_box.addWidget(figure_item)
@@ -389,27 +437,74 @@ class MainWindow(QWidget):
             QMessageBox.critical(
                 self, "Błąd", f"Nie udało się wczytać modelu:\n{str(e)}"
             )
-    
+
+    def closeEvent(self, event):
+        for loading_item in self.loading_items:
+            loading_item.task.cancel()
+        self.load_pool.waitForDone()
+        super().closeEvent(event)
+
     def add_light(self):
-        if len(self.gl_widget.lights) >= 8:
+        if len(self.gl_widget.lights) >= MAX_LIGHTS:
             QMessageBox.warning(
-                self, "Ostrzeżenie", "Maksymalna liczba świateł to 8."
+                self, "Ostrzeżenie", f"Maksymalna liczba świateł to {MAX_LIGHTS}."
             )
             return
         index = len(self.gl_widget.lights)
+        position = (5.0, 5.0, 5.0)
+        light_range = default_light_range(
+            position, [figure.world_bounds for figure in self.get_figures()]
+        )
         light = {
-            "position": QVector3D(5, 5, 5), 
-            "ambient": QVector3D(0.25, 0.25, 0.25), 
-            "diffuse": QVector3D(0.75, 0.75, 0.75), 
+            "position": QVector3D(*position),
+            "ambient": QVector3D(0.25, 0.25, 0.25),
+            "diffuse": QVector3D(0.75, 0.75, 0.75),
             "specular": QVector3D(1.0, 1.0, 1.0),
+            "range": light_range,  # finite, so the light is binned into clusters
             "visible": True,  # czy światło jest widoczne
         }
 
-        light_item = LightItem("light_"+str(self.lights_ever), light, self.gl_widget, index, self.lights_box, self)
+        light_item = LightItem(
+            "light_" + str(self.lights_ever),
+            light,
+            self.gl_widget,
+            index,
+            self.lights_box,
+            self,
+        )
+        # a new light holds its starting values on every existing keyframe
+        light_item.params_in_frames.insert_many(
+            self.frame_numbers,
+            [light_item.get_default_light_params()] * len(self.frame_numbers),
+        )
         self.lights_ever += 1
         self.lights_box.addWidget(light_item)
         self.gl_widget.add_light(light)
 
+    def get_figures(self):
+        figures = []
+        for i in range(self.figure_box.count()):
+            figure = self.figure_box.itemAt(i).widget()
+            if isinstance(figure, FigureItem):
+                figures.append(figure)
+        return figures
+
+    def get_lights(self):
+        lights = []
+        for i in range(self.lights_box.count()):
+            light = self.lights_box.itemAt(i).widget()
+            if isinstance(light, LightItem):
+                lights.append(light)
+        return lights
+
+    def set_frame_count(self):
+        frame_count = self.frame_count_input.value()
+        if self.frame_numbers and frame_count < self.frame_numbers[-1]:
+            # keyframes are never cut off by shortening the timeline
+            frame_count = self.frame_numbers[-1]
+            self.frame_count_input.setValue(frame_count)
+        self.timeline_view.set_frame_count(frame_count)
+
     def get_chosen_frame(self):
         chosen_frame_text = self.frame_number.text()
         find_hash = chosen_frame_text.find("#")
@@ -422,6 +517,61 @@ class MainWindow(QWidget):
     def on_button_click(self):
         self.gl_widget.change_background_color(0.2, 0.0, 0.5)
 
+    def scene_dict(self):
+        # everything the headless renderer needs to redraw the animation
+        camera = self.gl_widget.camera
+        return {
+            "background": list(self.gl_widget.color),
+            "camera": {
+                "position": [
+                    camera.position.x(),
+                    camera.position.y(),
+                    camera.position.z(),
+                ],
+                "yaw": camera.yaw,
+                "pitch": camera.pitch,
+                "zoom_fov": camera.zoom_fov,
+            },
+            "keyframes": list(self.frame_numbers),
+            "figures": [
+                {
+                    "name": figure.name,
+                    "path": figure.file_path,
+                    "smooth": figure.smooth,
+                    "visible": self.gl_widget.additional_visible_flags[figure.index],
+                    "params": figure.get_default_transform_params(),
+                    "keyframes": figure.params_in_frames,
+                }
+                for figure in self.get_figures()
+            ],
+            "lights": [
+                {
+                    "name": light.name,
+                    "visible": light.light["visible"],
+                    "params": light.get_default_light_params(),
+                    "keyframes": light.params_in_frames,
+                }
+                for light in self.get_lights()
+            ],
+        }
+
+    def save_scene_file(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Save scene", "", "Scene Files (*.json)"
+        )
+        if not path:
+            return
+        if not path.endswith(".json"):
+            path += ".json"
+        try:
+            save_scene(path, self.scene_dict())
+        except Exception as e:
+            QMessageBox.critical(
+                self, "Error", f"Error occured while saving scene: {e}"
+            )
+            return
+        print(f"Zapisano scenę do {path}")
+
     def generate_animation_movie(self):
         if len(self.frame_numbers) < 2:
             QMessageBox.warning(
@@ -449,33 +599,26 @@ class MainWindow(QWidget):
         current_ui_frame_to_restore = self.get_chosen_frame()
 
         try:
-            with iio.get_writer(path, fps=fps, codec='vp9', macro_block_size=None) as writer:
-                for frame_num in range(min_frame, max_frame + 1):
-                    for i in range(self.figure_box.count()):
-                        figure = self.figure_box.itemAt(i).widget()
-                        if isinstance(figure, FigureItem):
-                            params = figure.get_interpolated_params(frame_num)
-
-                            temp_vertices = figure.original_vertices.copy()
-                            figure.apply_scale(
-                                params["size_x"],
-                                params["size_y"],
-                                params["size_z"],
-                                temp_vertices,
-                            )
-                            figure.apply_rotation(
-                                params["rot_x"],
-                                params["rot_y"],
-                                params["rot_z"],
-                                temp_vertices,
-                            )
-                            figure.apply_location(params["centroid"], temp_vertices)
-
-                            self.gl_widget.updateModelVertices(
-                                figure.index, temp_vertices
-                            )
-
-                    self.gl_widget.update()
+            figures = self.get_figures()
+            animated_lights = [
+                light for light in self.get_lights() if light.params_in_frames
+            ]
+            # every figure and animated light on every frame, interpolated in one vectorized pass
+            baked = self.timeline.bake(figures, min_frame, max_frame)
+            baked_lights = self.light_timeline.bake(
+                animated_lights, min_frame, max_frame
+            )
+            with iio.get_writer(
+                path, fps=fps, codec="vp9", macro_block_size=None
+            ) as writer:
+                for frame_index in range(len(baked)):
+                    for figure, row in zip(figures, baked[frame_index]):
+                        figure.set_transform(params_from_row(row))
+                    for light_item, row in zip(
+                        animated_lights, baked_lights[frame_index]
+                    ):
+                        light_item.set_light_values(params_from_row(row, LIGHT_FIELDS))
+
                     QApplication.processEvents()
                     frame_image = self.gl_widget.grabFramebuffer()
                     writer.append_data(qimage_to_numpy(frame_image))  # pyright: ignore
@@ -490,17 +633,14 @@ class MainWindow(QWidget):
             self.frame_chosen(current_ui_frame_to_restore)
 
 
-def get_model_parameters(vertices):
-    min_x = min(vertex[0] for vertex in vertices)
-    max_x = max(vertex[0] for vertex in vertices)
-    min_y = min(vertex[1] for vertex in vertices)
-    max_y = max(vertex[1] for vertex in vertices)
-    min_z = min(vertex[2] for vertex in vertices)
-    max_z = max(vertex[2] for vertex in vertices)
+def get_model_parameters(bbox_min, bbox_max):
+    min_x, min_y, min_z = (float(c) for c in bbox_min)
+    max_x, max_y, max_z = (float(c) for c in bbox_max)
+    # bbox comes from float32 data, rounding keeps the parameter fields readable
     center = (
-        (min_x + max_x) / 2,
-        (min_y + max_y) / 2,
-        (min_z + max_z) / 2,
+        round((min_x + max_x) / 2, 6),
+        round((min_y + max_y) / 2, 6),
+        round((min_z + max_z) / 2, 6),
     )
     size_x = max_x - min_x
     size_y = max_y - min_y
@@ -520,14 +660,9 @@ def set_frame_to_figure(figure_widget, chosen_frame_number, params={}):
             "rot_z": 0,
         }
     else:
-        figure_widget.params_in_frames[chosen_frame_number] = {
-            'centroid': params['centroid'],
-            'size_x': params['size_x'],
-            'size_y': params['size_y'],
-            'size_z': params['size_z'],
-            'rot_x': params['rot_x'],
-            'rot_y': params['rot_y'],
-            'rot_z': params['rot_z']}
+        # KeyframeTrack copies the parameters (a row copy for another keyframe)
+        figure_widget.params_in_frames[chosen_frame_number] = params
+
 
 def clear_layout(layout):
     while layout.count():
@@ -550,8 +685,6 @@ def is_valid_float(text):
         return False
 
 
-
-
 def qimage_to_numpy(qimage: QImage):
     if qimage.format() != QImage.Format_RGBA8888:
         qimage = qimage.convertToFormat(QImage.Format_RGBA8888)
@@ -567,6 +700,8 @@ def qimage_to_numpy(qimage: QImage):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    # also names Qt's cache directory, where linked shader programs are kept
+    app.setApplicationName("animation-studio")
     window = MainWindow()
     window.show()
     sys.exit(app.exec_())
@@ -4,29 +4,60 @@ from OpenGL.GL import (
     glClear,
     glBindVertexArray,
     glDrawArrays,
+    glDrawElements,
     glGenVertexArrays,
     glGenBuffers,
     glDeleteVertexArrays,
     glDeleteBuffers,
     glBindBuffer,
     glBufferData,
+    glGetBufferSubData,
+    glCopyBufferSubData,
+    glMultiDrawArrays,
+    glMultiDrawElementsBaseVertex,
+    glGenTextures,
+    glBindTexture,
+    glActiveTexture,
+    glTexBuffer,
+    glGetIntegerv,
     glVertexAttribPointer,
+    glVertexAttribIPointer,
     glEnableVertexAttribArray,
     glViewport,
     GL_DEPTH_TEST,
     GL_COLOR_BUFFER_BIT,
     GL_DEPTH_BUFFER_BIT,
     GL_ARRAY_BUFFER,
+    GL_ELEMENT_ARRAY_BUFFER,
+    GL_COPY_READ_BUFFER,
+    GL_TEXTURE_BUFFER,
+    GL_TEXTURE0,
+    GL_RGBA32F,
+    GL_RG32UI,
+    GL_R32UI,
+    GL_VIEWPORT,
+    GL_DYNAMIC_DRAW,
+    GL_UNSIGNED_SHORT,
+    GL_UNSIGNED_INT,
     GL_STATIC_DRAW,
     GL_FLOAT,
+    GL_INT,
     GL_FALSE,
     GL_TRIANGLES,
 )
 from PyQt5.QtWidgets import QOpenGLWidget
 from utils.camera import Camera, Direction
-from PyQt5.QtCore import Qt, QPoint, QTimer
+from utils.frame_profiler import FrameProfiler
+from utils.frame_scheduler import FrameScheduler
+from utils.frustum import frustum_planes, spheres_in_frustum
+from utils.light_clusters import bin_lights, clip_range, depth_slice_params, pack_lights
+from utils.shader_program import ShaderProgram
+from utils.static_batches import MODEL_TEXELS, model_texels, plan_batches
+from PyQt5.QtCore import Qt, QPoint, QPointF, QRectF, QElapsedTimer
 from PyQt5.QtGui import (
-    QOpenGLShaderProgram,
+    QColor,
+    QPainter,
+    QPolygonF,
     QOpenGLShader,
     QMatrix4x4,
     QVector3D,
@@ -35,9 +66,34 @@ from PyQt5.QtGui import (
     QKeyEvent,
 )
 import ctypes
+import os
+import numpy as np
+
+# resolved next to this module, not against the working directory
+SHADER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shaders")
+phong_vert = os.path.join(SHADER_DIR, "phong.vert")
+phong_frag = os.path.join(SHADER_DIR, "phong.frag")
+
+MAX_LIGHTS = 1024
+# the same for every figure, sent once after linking
+MATERIAL = {
+    "material_ambient": (1.0, 0.2, 0.2),
+    "material_diffuse": (1.0, 0.2, 0.2),
+    "material_specular": (1.0, 1.0, 1.0),
+    "material_shininess": (32.0,),
+}
+LIGHT_SAMPLERS = ("lightData", "lightClusters", "lightIndices")  # texture units 0, 1, 2
+MODEL_SAMPLER = "modelData"  # texture unit 3, matrices of batched figures
+CAMERA_STEP_MS = 16  # Camera.movement_speed is the distance moved in this time
+OVERLAY_GRAPH_FRAMES = 120
+OVERLAY_SLOWEST_FIGURES = 3
+
+
+def section_summary(times):
+    return "  ".join(
+        f"{name} {ms:.2f}" for name, ms in times.items() if "/" not in name
+    )
 
-phong_vert = "shaders/phong.vert"
-phong_frag = "shaders/phong.frag"
 
 class MyGLWidget(QOpenGLWidget):
     def __init__(self):
@@ -48,9 +104,35 @@ class MyGLWidget(QOpenGLWidget):
         self.vbo = None
         self.additional_vaos = []
         self.additional_vbos = []
+        self.additional_ebos = []  # 0 for figures drawn without an index buffer
+        self.additional_index_types = []
         self.additional_vertex_counts = []
         self.additional_visible_flags = []
+        self.additional_memory_stats = []
+        self.additional_model_matrices = []
+        self.additional_normal_matrices = []  # computed once per model matrix change
+        # optional: static figures packed into shared buffers, one multi-draw per batch
+        self.batching = False
+        self.batches = None
+        self.batches_dirty = True  # figures added, removed or started to deform
+        self.batched_figures = np.zeros(0, dtype=bool)
+        # model and normal matrix of every figure, read by the shader in batched draws
+        self.model_texels = np.zeros((0, MODEL_TEXELS, 4), dtype=np.float32)
+        self.model_texels_dirty = True
+        # world-space bounding sphere (x, y, z, radius) of every figure, for culling
+        self.bounding_spheres = np.empty((0, 4))
+        self.figures_drawn = 0  # in the last frame
+        self.figures_culled = 0
         self.visible_lights = []
+        self.texture_buffers = None
+        self.lights_dirty = True
+        self.uploaded_lights = None
+        self.global_light_count = 0
+        self.ranged_lights = (np.empty((0, 3)), np.empty(0))
+        self.cluster_key = None
+        self.light_uploads = 0  # how many times the light data went to the GPU
+        self.cluster_uploads = 0
+        self.light_stats = {}
 
         self.camera = Camera(
             position=QVector3D(3, 3, 5), yaw=-135.0, pitch=-30.0, zoom_fov=45.0
@@ -61,90 +143,217 @@ class MyGLWidget(QOpenGLWidget):
         self.last_mouse_pos = QPoint()
         self.keys_pressed = set()
 
-        # timer for smooth camera movement
-        self.camera_move_timer = QTimer(self)
-        self.camera_move_timer.timeout.connect(self.update_camera_position_from_keys)
-        self.timer_interval = 16
+        # startup-to-first-frame, measured from the creation of the widget
+        self.startup_timer = QElapsedTimer()
+        self.startup_timer.start()
+        self.first_frame_ms = None
+        self.shader_setup_ms = 0.0
+
+        # all repaints go through the scheduler, at most one per display refresh
+        self.scheduler = FrameScheduler(self, self)
+        # optional CPU/GPU timings per section of paintGL, drawn over the scene
+        self.profiler = FrameProfiler()
+        self.profiling = False
 
     def initializeGL(self):
         glEnable(GL_DEPTH_TEST)
         # glEnable(GL_CULL_FACE)
         self.initShaders()
+        self.initLightBuffer()
 
     def resizeGL(self, w, h):
         glViewport(0, 0, w, h)
 
     def paintGL(self):
+        profiler = self.profiler if self.profiling else None
+        if profiler:
+            profiler.begin_frame()
+            profiler.section("clear")
+        # every frame: a profiler overlay painted on an earlier frame turned it off
+        glEnable(GL_DEPTH_TEST)
         glClearColor(self.color[0], self.color[1], self.color[2], 1.0)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)  # type: ignore
+        self.scheduler.frame_painted()
+        if self.first_frame_ms is None:
+            self.first_frame_ms = self.startup_timer.nsecsElapsed() / 1e6
+            print(
+                f"Pierwsza klatka po {self.first_frame_ms:.0f} ms "
+                f"(shadery: {self.shader_setup_ms:.1f} ms)"
+            )
 
         if not self.shader_program:
+            if profiler:
+                profiler.end_frame()
             return
 
-        self.shader_program.bind()
-
-        model = QMatrix4x4()
-        view = self.camera.get_view_matrix()
-
-        
+        if profiler:
+            profiler.section("uniforms")
+        program = self.shader_program
+        program.bind()
 
         aspect_ratio = self.width() / max(1, self.height())
+        view = self.camera.get_view_matrix()
         projection = self.camera.get_projection_matrix(aspect_ratio)
-
-        self.shader_program.setUniformValue("M", model)
-        self.shader_program.setUniformValue("view", view)
-        self.shader_program.setUniformValue("projection", projection)
-
-        self.shader_program.setUniformValue("light_position", 5.0, 5.0, 5.0)
-        self.shader_program.setUniformValue(
-            "viewPos",
-            self.camera.position.x(),
-            self.camera.position.y(),
-            self.camera.position.z(),
+        program.set_uniform("view", view)
+        program.set_uniform("projection", projection)
+        position = self.camera.position
+        program.set_uniform("viewPos", position.x(), position.y(), position.z())
+
+        if profiler:
+            profiler.section("lights")
+        self.upload_lights(view, projection)
+
+        if profiler:
+            profiler.section("culling")
+        # figures whose bounding sphere is outside the camera frustum are not drawn
+        planes = frustum_planes(
+            np.array((projection * view).copyDataTo()).reshape(4, 4)
+        )
+        in_view = spheres_in_frustum(planes, self.bounding_spheres).tolist()
+        self.figures_drawn = 0
+        self.figures_culled = 0
+
+        if self.batching and self.batches_dirty:
+            self.build_batches()
+        batched = (
+            self.batched_figures.tolist() if self.batching else [False] * len(in_view)
         )
-        self.shader_program.setUniformValue("material_ambient", 1.0, 0.2, 0.2)
-        self.shader_program.setUniformValue("material_diffuse", 1.0, 0.2, 0.2)
-        self.shader_program.setUniformValue("material_specular", 1.0, 1.0, 1.0)
-        self.shader_program.setUniformValue("material_shininess", 32.0)        
-
-        self.shader_program.setUniformValue("numLights", len(self.lights))
-        for i, light in enumerate(self.lights):
-            if light["visible"] == True:  # ensure light is visible
-                self.shader_program.setUniformValue(f"lights[{i}].position", light["position"])
-                self.shader_program.setUniformValue(f"lights[{i}].ambient", light["ambient"])
-                self.shader_program.setUniformValue(f"lights[{i}].diffuse", light["diffuse"])
-                self.shader_program.setUniformValue(f"lights[{i}].specular", light["specular"])
-            else:
-                self.shader_program.setUniformValue(f"lights[{i}].position", QVector3D(0, 0, 0))
-                self.shader_program.setUniformValue(f"lights[{i}].ambient", QVector3D(0, 0, 0))
-                self.shader_program.setUniformValue(f"lights[{i}].diffuse", QVector3D(0, 0, 0))
-                self.shader_program.setUniformValue(f"lights[{i}].specular", QVector3D(0, 0, 0))
 
-        for vao, count, visible in zip(
+        if profiler:
+            profiler.section("draw")
+        figures = zip(
             self.additional_vaos,
+            self.additional_ebos,
+            self.additional_index_types,
             self.additional_vertex_counts,
             self.additional_visible_flags,
-        ):
+            self.additional_model_matrices,
+            self.additional_normal_matrices,
+            in_view,
+            batched,
+        )
+        for index, (
+            vao,
+            ebo,
+            index_type,
+            count,
+            visible,
+            model,
+            normal,
+            inside,
+            in_batch,
+        ) in enumerate(figures):
             if not visible:
                 continue
+            if not inside:
+                self.figures_culled += 1
+                continue
+            self.figures_drawn += 1
+            if in_batch:
+                continue
+            if profiler:
+                profiler.section(f"draw/figure {index}")
+            # geometry stays static on the GPU, figures are placed by their model matrix
+            program.set_uniform("M", model)
+            program.set_uniform("normalMatrix", normal)
             glBindVertexArray(vao)
-            glDrawArrays(GL_TRIANGLES, 0, count)
+            if ebo:
+                glDrawElements(GL_TRIANGLES, count, index_type, None)
+            else:
+                glDrawArrays(GL_TRIANGLES, 0, count)
+        if self.batching:
+            drawn = np.array(self.additional_visible_flags, dtype=bool) & np.array(
+                in_view, dtype=bool
+            )
+            self.draw_batches(drawn, profiler)
         glBindVertexArray(0)
 
-        self.shader_program.release()
+        program.release()
+        if profiler:
+            profiler.end_frame()
+            self.paint_profiler_overlay()
+
+    def set_profiling(self, enabled):
+        self.profiling = enabled
+        if not enabled:
+            self.profiler.discard_pending()
+        self.request_frame()
+
+    def paint_profiler_overlay(self):
+        # results arrive a few frames late, the overlay shows the newest finished frame
+        history = self.profiler.history
+        if not history:
+            return
+        last = history[-1]
+        figures = sorted(
+            (ms, name[len("draw/") :])
+            for name, ms in last["gpu"].items()
+            if name.startswith("draw/")
+        )[::-1][:OVERLAY_SLOWEST_FIGURES]
+        bound = "GPU" if last["gpu_ms"] > last["cpu_ms"] else "CPU"
+        lines = [
+            f"frame {last['frame']}  CPU {last['cpu_ms']:.2f} ms  GPU {last['gpu_ms']:.2f} ms"
+            f"  ({bound}-bound)",
+            f"CPU ms: {section_summary(last['cpu'])}",
+            f"GPU ms: {section_summary(last['gpu'])}",
+            f"repaints: {self.scheduler.frames_painted} painted"
+            f" for {self.scheduler.frames_requested} requests",
+        ]
+        if figures:
+            lines.append(
+                "slowest on GPU: "
+                + ", ".join(f"{name} {ms:.2f}" for ms, name in figures)
+            )
+
+        painter = QPainter(self)
+        metrics = painter.fontMetrics()
+        line_height = metrics.height()
+        text_width = max(metrics.horizontalAdvance(line) for line in lines)
+        graph = QRectF(8, 8 + len(lines) * line_height + 6, max(240, text_width), 60)
+        painter.fillRect(
+            QRectF(0, 0, graph.right() + 8, graph.bottom() + 8), QColor(0, 0, 0, 160)
+        )
+        painter.setPen(QColor(230, 230, 230))
+        for row, line in enumerate(lines):
+            painter.drawText(QPointF(8, 8 + metrics.ascent() + row * line_height), line)
+
+        # rolling frame times, scaled to at least two 60 Hz frames
+        frames = list(history)[-OVERLAY_GRAPH_FRAMES:]
+        scale = max(1000 / 30, *(max(f["cpu_ms"], f["gpu_ms"]) for f in frames))
+        step = graph.width() / max(1, OVERLAY_GRAPH_FRAMES - 1)
+
+        def y_of(ms):
+            return graph.bottom() - ms / scale * graph.height()
+
+        painter.setPen(QColor(120, 120, 120))
+        frame_60hz = y_of(1000 / 60)
+        painter.drawLine(
+            QPointF(graph.left(), frame_60hz), QPointF(graph.right(), frame_60hz)
+        )
+        for key, color in (
+            ("cpu_ms", QColor(255, 200, 60)),
+            ("gpu_ms", QColor(80, 200, 255)),
+        ):
+            painter.setPen(color)
+            painter.drawPolyline(
+                QPolygonF(
+                    [
+                        QPointF(graph.left() + i * step, y_of(f[key]))
+                        for i, f in enumerate(frames)
+                    ]
+                )
+            )
+        painter.end()
 
     def set_camera_interaction_active(self, active):
         self.camera_interaction_mode = active
         if active:
             self.setFocus(Qt.FocusReason.MouseFocusReason)
-            if not self.camera_move_timer.isActive():
-                self.camera_move_timer.start(self.timer_interval)
             print("Tryb kamery WŁĄCZONY")
         else:
             self.clearFocus()
             self.unsetCursor()
-            if self.camera_move_timer.isActive():
-                self.camera_move_timer.stop()
+            self.scheduler.stop_animation("camera")
             self.keys_pressed.clear()
             print("Tryb kamery WYŁĄCZONY")
 
@@ -171,7 +380,7 @@ class MyGLWidget(QOpenGLWidget):
 
             if offset_x != 0 or offset_y != 0:
                 self.camera.process_mouse_movement(offset_x, offset_y)
-                self.update()
+                self.request_frame()
         else:
             super().mouseMoveEvent(event)
 
@@ -185,13 +394,17 @@ class MyGLWidget(QOpenGLWidget):
         if self.camera_interaction_mode:
             scroll_delta = event.angleDelta().y() / 120
             self.camera.process_mouse_scroll(scroll_delta)
-            self.update()
+            self.request_frame()
         else:
             super().wheelEvent(event)
 
     def keyPressEvent(self, event: QKeyEvent):
         if self.camera_interaction_mode:
             self.keys_pressed.add(event.key())
+            # the camera moves only while a key is held, then the scheduler goes idle
+            self.scheduler.start_animation(
+                "camera", self.update_camera_position_from_keys
+            )
             event.accept()
         else:
             super().keyPressEvent(event)
@@ -200,50 +413,50 @@ class MyGLWidget(QOpenGLWidget):
         if self.camera_interaction_mode and not event.isAutoRepeat():
             if event.key() in self.keys_pressed:
                 self.keys_pressed.remove(event.key())
+            if not self.keys_pressed:
+                self.scheduler.stop_animation("camera")
             event.accept()
         else:
             super().keyReleaseEvent(event)
 
-    def update_camera_position_from_keys(self):
+    def update_camera_position_from_keys(self, elapsed_ms=CAMERA_STEP_MS):
         if not self.camera_interaction_mode or not self.hasFocus():
+            self.keys_pressed.clear()
+            self.scheduler.stop_animation("camera")
             return
 
-        moved = False
-        velocity_multiplier = 1.0
+        # movement_speed is per CAMERA_STEP_MS, this keeps it independent of the frame rate
+        velocity_multiplier = elapsed_ms / CAMERA_STEP_MS
 
         if Qt.Key.Key_W in self.keys_pressed:
             self.camera.process_keyboard_movement(
                 Direction.FORWARD, velocity_multiplier
             )
-            moved = True
         if Qt.Key.Key_S in self.keys_pressed:
             self.camera.process_keyboard_movement(
                 Direction.BACKWARD, velocity_multiplier
             )
-            moved = True
         if Qt.Key.Key_A in self.keys_pressed:
             self.camera.process_keyboard_movement(Direction.LEFT, velocity_multiplier)
-            moved = True
         if Qt.Key.Key_D in self.keys_pressed:
             self.camera.process_keyboard_movement(Direction.RIGHT, velocity_multiplier)
-            moved = True
         if Qt.Key.Key_Space in self.keys_pressed:
             self.camera.process_keyboard_movement(Direction.UP, velocity_multiplier)
-            moved = True
         if Qt.Key.Key_Control in self.keys_pressed:
             self.camera.process_keyboard_movement(Direction.DOWN, velocity_multiplier)
-            moved = True
-
-        if moved:
-            self.update()
 
     def initShaders(self):
-        self.shader_program = QOpenGLShaderProgram()
-        if not self.shader_program.addShaderFromSourceFile(
+        shader_timer = QElapsedTimer()
+        shader_timer.start()
+        # cacheable shaders: link() loads the program binary Qt stored on an
+        # earlier run (keyed by the sources and the GL vendor/renderer/version)
+        # and compiles from source only when there is none or the driver rejects it
+        self.shader_program = ShaderProgram()
+        if not self.shader_program.addCacheableShaderFromSourceFile(
             QOpenGLShader.Vertex, phong_vert  # type: ignore
         ):
             print("Błąd wczytywania vertex shadera")
-        if not self.shader_program.addShaderFromSourceFile(
+        if not self.shader_program.addCacheableShaderFromSourceFile(
             QOpenGLShader.Fragment, phong_frag  # type: ignore
         ):
             print("Błąd wczytywania fragment shadera")
@@ -253,21 +466,122 @@ class MyGLWidget(QOpenGLWidget):
         if not self.shader_program.link():
             print("Błąd linkowania shaderów")
             print(self.shader_program.log())
+            return
+        self.shader_setup_ms = shader_timer.nsecsElapsed() / 1e6
+
+        # the material is the same for every figure and frame, it is sent once
+        self.shader_program.bind()
+        for name, value in MATERIAL.items():
+            self.shader_program.set_uniform(name, *value)
+        self.shader_program.release()
+
+    def initLightBuffer(self):
+        # texture buffers: light data, per-cluster (offset, count), light indices
+        # and the matrices of batched figures
+        self.texture_buffers = {}
+        for name, texture_format in zip(
+            LIGHT_SAMPLERS + (MODEL_SAMPLER,),
+            (GL_RGBA32F, GL_RG32UI, GL_R32UI, GL_RGBA32F),
+        ):
+            buffer = glGenBuffers(1)
+            glBindBuffer(GL_TEXTURE_BUFFER, buffer)
+            glBufferData(GL_TEXTURE_BUFFER, 16, None, GL_DYNAMIC_DRAW)
+            texture = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_BUFFER, texture)
+            glTexBuffer(GL_TEXTURE_BUFFER, texture_format, buffer)
+            self.texture_buffers[name] = (buffer, texture)
+        glBindTexture(GL_TEXTURE_BUFFER, 0)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+
+        self.shader_program.bind()
+        for unit, name in enumerate(LIGHT_SAMPLERS + (MODEL_SAMPLER,)):
+            self.shader_program.set_uniform(name, unit)
+        self.shader_program.release()
+        self.lights_dirty = True
+
+    def upload_lights(self, view, projection):
+        # light data is repacked only after lights_changed(), the clusters are
+        # rebuilt when the lights, the camera or the viewport change
+        if self.texture_buffers is None:
+            return
+        if self.lights_dirty:
+            self.lights_dirty = False
+            texels, self.global_light_count, centers, radii = pack_lights(self.lights)
+            self.ranged_lights = (centers, radii)
+            if not np.array_equal(texels, self.uploaded_lights):
+                self.upload_texture_buffer("lightData", texels)
+                self.uploaded_lights = texels
+                self.light_uploads += 1
+                self.cluster_key = None
+
+        viewport = tuple(glGetIntegerv(GL_VIEWPORT)[2:])
+        key = (tuple(view.copyDataTo()), tuple(projection.copyDataTo()), viewport)
+        if key != self.cluster_key:
+            self.cluster_key = key
+            self.build_light_clusters(view, projection, viewport)
+
+        self.shader_program.set_uniform("numGlobalLights", self.global_light_count)
+        for unit, name in enumerate(LIGHT_SAMPLERS):
+            glActiveTexture(GL_TEXTURE0 + unit)
+            glBindTexture(GL_TEXTURE_BUFFER, self.texture_buffers[name][1])
+        glActiveTexture(GL_TEXTURE0)
+
+    def build_light_clusters(self, view, projection, viewport):
+        view = np.array(view.copyDataTo(), dtype=np.float64).reshape(4, 4)
+        projection = np.array(projection.copyDataTo(), dtype=np.float64).reshape(4, 4)
+        centers, radii = self.ranged_lights
+        clusters, indices = bin_lights(
+            centers @ view[:3, :3].T + view[:3, 3], radii, projection
+        )
+        indices += self.global_light_count  # cluster lights follow the global ones
+        self.upload_texture_buffer("lightClusters", clusters)
+        self.upload_texture_buffer(
+            "lightIndices", indices if len(indices) else np.zeros(1, np.uint32)
+        )
+        self.cluster_uploads += 1
+
+        scale, bias = depth_slice_params(*clip_range(projection))
+        self.shader_program.set_uniform(
+            "clusterParams",
+            float(viewport[0]),
+            float(viewport[1]),
+            float(scale),
+            float(bias),
+        )
+        counts = clusters[:, 1]
+        self.light_stats = {
+            "global": self.global_light_count,
+            "clustered": len(radii),
+            "mean_per_cluster": float(counts.mean()),
+            "max_per_cluster": int(counts.max()),
+        }
+
+    def upload_texture_buffer(self, name, data):
+        glBindBuffer(GL_TEXTURE_BUFFER, self.texture_buffers[name][0])
+        glBufferData(GL_TEXTURE_BUFFER, data.nbytes, data, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+
+    def lights_changed(self):
+        self.lights_dirty = True
+        self.request_frame()
+
+    def request_frame(self):
+        self.scheduler.request_frame()
 
     def add_light(self, light):
         print("dodano światło")
         self.lights.append(light)
         # self.visible_lights.append(True)  # domyślnie światło jest widoczne
-        self.update()
+        self.lights_changed()
 
     def delete_light(self, index):
         if 0 <= index < len(self.lights):
             del self.lights[index]
-            self.update()
+            self.lights_changed()
         else:
             print("Nieprawidłowy indeks światła do usunięcia")
 
-    def loadModel(self, vertices_np):
+    def loadModel(self, vertices_np, indices_np=None):
         self.makeCurrent()  # activate OpenGL context
 
         vao = glGenVertexArrays(1)
@@ -291,43 +605,246 @@ class MyGLWidget(QOpenGLWidget):
         )
         glEnableVertexAttribArray(1)
 
+        ebo = 0
+        index_type = None
+        vertex_count = len(vertices_np) // 6
+        if indices_np is not None:
+            # the element buffer binding is stored in the VAO
+            ebo = glGenBuffers(1)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ebo)
+            glBufferData(
+                GL_ELEMENT_ARRAY_BUFFER, indices_np.nbytes, indices_np, GL_STATIC_DRAW
+            )
+            index_type = (
+                GL_UNSIGNED_SHORT if indices_np.dtype == np.uint16 else GL_UNSIGNED_INT
+            )
+            vertex_count = len(indices_np)
+
         glBindBuffer(GL_ARRAY_BUFFER, 0)
         glBindVertexArray(0)
 
         # save to list to draw in paintGL
         self.additional_vaos.append(vao)
         self.additional_vbos.append(vbo)
-        self.additional_vertex_counts.append(len(vertices_np) // 6)
+        self.additional_ebos.append(ebo)
+        self.additional_index_types.append(index_type)
+        self.additional_vertex_counts.append(vertex_count)
 
         self.doneCurrent()  # free context
         self.additional_visible_flags.append(True)
+        self.additional_model_matrices.append(QMatrix4x4())
+        self.additional_normal_matrices.append(QMatrix4x4().normalMatrix())
+        self.model_texels = np.concatenate(
+            [
+                self.model_texels,
+                model_texels(QMatrix4x4(), QMatrix4x4().normalMatrix())[None],
+            ]
+        )
+        self.model_texels_dirty = True
+        self.batches_dirty = True
+        # never culled until the figure reports its bounds
+        self.bounding_spheres = np.vstack(
+            [self.bounding_spheres, (0.0, 0.0, 0.0, np.inf)]
+        )
+        self.additional_memory_stats.append(
+            {
+                "unique_vertices": len(vertices_np) // 6,
+                "corners": vertex_count,
+                "gpu_bytes": vertices_np.nbytes
+                + (indices_np.nbytes if indices_np is not None else 0),
+                "unindexed_bytes": vertex_count * 6 * vertices_np.itemsize,
+            }
+        )
 
-        self.update()
+        self.request_frame()
 
-    def updateModelVertices(self, model_index, vertices_np):
-        self.makeCurrent()
+    def set_model_matrix(self, model_index, matrix, normal_matrix=None, texels=None):
+        # callers holding precomputed normal matrix and texels (TransformCache) pass them in
+        if normal_matrix is None:
+            normal_matrix = matrix.normalMatrix()
+        if texels is None:
+            texels = model_texels(matrix, normal_matrix)
+        self.additional_model_matrices[model_index] = matrix
+        self.additional_normal_matrices[model_index] = normal_matrix
+        self.model_texels[model_index] = texels
+        self.model_texels_dirty = True
+        self.request_frame()
 
-        vbo_id = self.additional_vbos[model_index]  # surowe ID
-        glBindBuffer(GL_ARRAY_BUFFER, vbo_id)
-        glBufferData(GL_ARRAY_BUFFER, vertices_np.nbytes, vertices_np, GL_STATIC_DRAW)
-        glBindBuffer(GL_ARRAY_BUFFER, 0)
+    def set_figure_visible(self, model_index, visible):
+        # batched figures stay packed, paintGL only leaves them out of the draw list
+        self.additional_visible_flags[model_index] = visible
+        self.request_frame()
 
-        self.doneCurrent()
-        self.update()
+    def set_bounding_sphere(self, model_index, center, radius):
+        self.bounding_spheres[model_index] = (*center, radius)
 
     def delete_model(self, index):
         self.makeCurrent()
         glDeleteVertexArrays(1, [self.additional_vaos[index]])
         glDeleteBuffers(1, [self.additional_vbos[index]])
+        if self.additional_ebos[index]:
+            glDeleteBuffers(1, [self.additional_ebos[index]])
         self.doneCurrent()
 
         del self.additional_vaos[index]
         del self.additional_vbos[index]
+        del self.additional_ebos[index]
+        del self.additional_index_types[index]
         del self.additional_vertex_counts[index]
         del self.additional_visible_flags[index]
+        del self.additional_memory_stats[index]
+        del self.additional_model_matrices[index]
+        del self.additional_normal_matrices[index]
+        self.model_texels = np.delete(self.model_texels, index, axis=0)
+        self.model_texels_dirty = True
+        self.batches_dirty = True
+        self.bounding_spheres = np.delete(self.bounding_spheres, index, axis=0)
+
+        self.request_frame()
+
+    def set_batching(self, enabled):
+        self.batching = enabled
+        if not enabled and self.batches is not None:
+            self.makeCurrent()
+            self.release_batches()
+            self.doneCurrent()
+        self.batches_dirty = True
+        self.request_frame()
+
+    def build_batches(self):
+        """Packs the static figures into shared buffers, see plan_batches.
+
+        Vertices are copied buffer to buffer on the GPU. Every vertex also
+        gets the number of its figure (attribute 2), the vertex shader reads
+        that figure's matrices from the modelData texture buffer. Indices
+        are read back once and rewritten as GL_UNSIGNED_INT.
+        """
+        self.release_batches()
+        self.batches_dirty = False
+        figures = range(len(self.additional_vaos))
+        vertex_counts = [
+            self.additional_memory_stats[index]["unique_vertices"] for index in figures
+        ]
+        index_counts = [
+            self.additional_vertex_counts[index] if self.additional_ebos[index] else 0
+            for index in figures
+        ]
+        self.batches = plan_batches(figures, vertex_counts, index_counts)
+        self.batched_figures = np.zeros(len(self.additional_vaos), dtype=bool)
+
+        row = 6 * 4  # bytes per vertex
+        for batch in self.batches:
+            figures = batch["figures"]
+            self.batched_figures[figures] = True
+            counts = np.array(
+                [self.additional_memory_stats[i]["unique_vertices"] for i in figures]
+            )
 
-        self.update()
+            vao = glGenVertexArrays(1)
+            glBindVertexArray(vao)
+            vbo = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, vbo)
+            glBufferData(GL_ARRAY_BUFFER, batch["vertices"] * row, None, GL_STATIC_DRAW)
+            for figure, first, count in zip(figures, batch["first_vertex"], counts):
+                glBindBuffer(GL_COPY_READ_BUFFER, self.additional_vbos[figure])
+                glCopyBufferSubData(
+                    GL_COPY_READ_BUFFER,
+                    GL_ARRAY_BUFFER,
+                    0,
+                    int(first) * row,
+                    int(count) * row,
+                )
+            glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, row, ctypes.c_void_p(0))
+            glEnableVertexAttribArray(0)
+            glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, row, ctypes.c_void_p(12))
+            glEnableVertexAttribArray(1)
+
+            slots = np.repeat(figures, counts).astype(np.int32)
+            slot_vbo = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, slot_vbo)
+            glBufferData(GL_ARRAY_BUFFER, slots.nbytes, slots, GL_STATIC_DRAW)
+            glVertexAttribIPointer(2, 1, GL_INT, 0, None)
+            glEnableVertexAttribArray(2)
+            batch["buffers"] = [vbo, slot_vbo]
+
+            if batch["indexed"]:
+                parts = []
+                for figure in figures:
+                    dtype = (
+                        np.uint16
+                        if self.additional_index_types[figure] == GL_UNSIGNED_SHORT
+                        else np.uint32
+                    )
+                    size = (
+                        self.additional_vertex_counts[figure] * np.dtype(dtype).itemsize
+                    )
+                    glBindBuffer(GL_COPY_READ_BUFFER, self.additional_ebos[figure])
+                    data = glGetBufferSubData(GL_COPY_READ_BUFFER, 0, size)
+                    parts.append(np.frombuffer(data, dtype=dtype))
+                indices = np.concatenate(parts).astype(np.uint32)
+                ebo = glGenBuffers(1)
+                glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ebo)
+                glBufferData(
+                    GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW
+                )
+                batch["buffers"].append(ebo)
+                batch["counts"] = np.array(
+                    [self.additional_vertex_counts[i] for i in figures], dtype=np.int32
+                )
+                batch["offsets"] = (batch["first_index"] * 4).astype(np.uintp)
+                batch["base_vertex"] = batch["first_vertex"].astype(np.int32)
+            else:
+                batch["counts"] = counts.astype(np.int32)
+                batch["firsts"] = batch["first_vertex"].astype(np.int32)
+            batch["vao"] = vao
+            glBindVertexArray(0)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+            glBindBuffer(GL_COPY_READ_BUFFER, 0)
+
+    def release_batches(self):
+        for batch in self.batches or []:
+            glDeleteVertexArrays(1, [batch["vao"]])
+            glDeleteBuffers(len(batch["buffers"]), batch["buffers"])
+        self.batches = None
+        self.batched_figures = np.zeros(len(self.additional_vaos), dtype=bool)
+
+    def draw_batches(self, drawn, profiler=None):
+        # `drawn`: figures visible and inside the frustum; hidden ones only
+        # drop out of the (first, count) lists, the buffers stay as they are
+        if self.model_texels_dirty and len(self.model_texels):
+            self.model_texels_dirty = False
+            self.upload_texture_buffer(MODEL_SAMPLER, self.model_texels)
+        program = self.shader_program
+        program.set_uniform("batched", 1)
+        glActiveTexture(GL_TEXTURE0 + len(LIGHT_SAMPLERS))
+        glBindTexture(GL_TEXTURE_BUFFER, self.texture_buffers[MODEL_SAMPLER][1])
+        glActiveTexture(GL_TEXTURE0)
+        for number, batch in enumerate(self.batches):
+            chosen = drawn[batch["figures"]]
+            draw_count = int(chosen.sum())
+            if not draw_count:
+                continue
+            if profiler:
+                profiler.section(f"draw/batch {number}")
+            glBindVertexArray(batch["vao"])
+            if batch["indexed"]:
+                glMultiDrawElementsBaseVertex(
+                    GL_TRIANGLES,
+                    batch["counts"][chosen],
+                    GL_UNSIGNED_INT,
+                    batch["offsets"][chosen],
+                    draw_count,
+                    batch["base_vertex"][chosen],
+                )
+            else:
+                glMultiDrawArrays(
+                    GL_TRIANGLES,
+                    batch["firsts"][chosen],
+                    batch["counts"][chosen],
+                    draw_count,
+                )
+        program.set_uniform("batched", 0)
 
     def change_background_color(self, r, g, b):
         self.color = [r, g, b]
-        self.update()
+        self.request_frame()
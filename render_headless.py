@@ -0,0 +1,494 @@
+"""Renders a saved scene ("Save scene" in the editor) without a display.
+
+    python render_headless.py scene.json -o film.webm --size 1280x720 --fps 30
+    python render_headless.py scene.json -o frames/ --first 0 --last 10
+
+The GL context comes from EGL without any window surface, so this runs on
+machines with no X server and no GPU through Mesa's software rasterizer
+(llvmpipe). Frames are drawn into a framebuffer object of the requested
+size; no QApplication and no widget is created.
+"""
+
+import os
+
+# PyOpenGL picks its platform on the first import of OpenGL
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+import argparse  # noqa: E402
+import ctypes  # noqa: E402
+import time  # noqa: E402
+
+import imageio.v2 as iio  # noqa: E402
+import numpy as np  # noqa: E402
+from OpenGL import EGL  # noqa: E402
+from OpenGL.GL import (  # noqa: E402
+    glActiveTexture,
+    glAttachShader,
+    glBindBuffer,
+    glBindFramebuffer,
+    glBindRenderbuffer,
+    glBindTexture,
+    glBindVertexArray,
+    glBufferData,
+    glCheckFramebufferStatus,
+    glClear,
+    glClearColor,
+    glCreateProgram,
+    glDrawArrays,
+    glDrawElements,
+    glEnable,
+    glEnableVertexAttribArray,
+    glFinish,
+    glFramebufferRenderbuffer,
+    glGenBuffers,
+    glGenFramebuffers,
+    glGenRenderbuffers,
+    glGenTextures,
+    glGenVertexArrays,
+    glGetProgramInfoLog,
+    glGetProgramiv,
+    glGetUniformLocation,
+    glLinkProgram,
+    glReadPixels,
+    glRenderbufferStorage,
+    glTexBuffer,
+    glUniform1f,
+    glUniform1i,
+    glUniform3f,
+    glUniform4f,
+    glUniformMatrix3fv,
+    glUniformMatrix4fv,
+    glUseProgram,
+    glVertexAttribPointer,
+    glViewport,
+    GL_ARRAY_BUFFER,
+    GL_COLOR_ATTACHMENT0,
+    GL_COLOR_BUFFER_BIT,
+    GL_DEPTH_ATTACHMENT,
+    GL_DEPTH_BUFFER_BIT,
+    GL_DEPTH_COMPONENT24,
+    GL_DEPTH_TEST,
+    GL_DYNAMIC_DRAW,
+    GL_ELEMENT_ARRAY_BUFFER,
+    GL_FALSE,
+    GL_FLOAT,
+    GL_FRAGMENT_SHADER,
+    GL_FRAMEBUFFER,
+    GL_FRAMEBUFFER_COMPLETE,
+    GL_LINK_STATUS,
+    GL_R32UI,
+    GL_RENDERBUFFER,
+    GL_RG32UI,
+    GL_RGBA,
+    GL_RGBA32F,
+    GL_RGBA8,
+    GL_STATIC_DRAW,
+    GL_TEXTURE0,
+    GL_TEXTURE_BUFFER,
+    GL_TRIANGLES,
+    GL_UNSIGNED_BYTE,
+    GL_UNSIGNED_INT,
+    GL_UNSIGNED_SHORT,
+    GL_VERTEX_SHADER,
+)
+from OpenGL.GL.shaders import compileShader  # noqa: E402
+from PyQt5.QtGui import QMatrix4x4, QVector3D  # noqa: E402
+
+from loader.background import load_model_geometry  # noqa: E402
+from loader.mesh_cache import MeshCache  # noqa: E402
+from my_gl_widget import (
+    LIGHT_SAMPLERS,
+    MATERIAL,
+    MODEL_SAMPLER,
+    phong_frag,
+    phong_vert,
+)  # noqa: E402
+from utils.bounds import Bounds  # noqa: E402
+from utils.camera import Camera  # noqa: E402
+from utils.keyframes import LIGHT_FIELDS  # noqa: E402
+from utils.light_clusters import (  # noqa: E402
+    bin_lights,
+    clip_range,
+    depth_slice_params,
+    pack_lights,
+)
+from utils.scene import load_scene  # noqa: E402
+from utils.timeline import TimelineBake, light_defaults, params_from_row  # noqa: E402
+from utils.transform import transform_matrix  # noqa: E402
+
+VIDEO_CODECS = {".webm": "vp9", ".mp4": "libx264"}
+
+
+def create_egl_context():
+    """A GL 3.3 core context without a surface, current on this thread."""
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if display == EGL.EGL_NO_DISPLAY or not EGL.eglInitialize(display, None, None):
+        raise RuntimeError("EGL niedostępne (potrzebne Mesa/libEGL)")
+    config_attributes = (EGL.EGLint * 5)(
+        EGL.EGL_RENDERABLE_TYPE,
+        EGL.EGL_OPENGL_BIT,
+        EGL.EGL_SURFACE_TYPE,
+        EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_NONE,
+    )
+    config = EGL.EGLConfig()
+    config_count = EGL.EGLint()
+    EGL.eglChooseConfig(
+        display,
+        config_attributes,
+        ctypes.pointer(config),
+        1,
+        ctypes.pointer(config_count),
+    )
+    if config_count.value == 0:
+        raise RuntimeError("Brak konfiguracji EGL z OpenGL")
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context_attributes = (EGL.EGLint * 7)(
+        EGL.EGL_CONTEXT_MAJOR_VERSION,
+        3,
+        EGL.EGL_CONTEXT_MINOR_VERSION,
+        3,
+        EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK,
+        EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+        EGL.EGL_NONE,
+    )
+    context = EGL.eglCreateContext(
+        display, config, EGL.EGL_NO_CONTEXT, context_attributes
+    )
+    if context == EGL.EGL_NO_CONTEXT or not EGL.eglMakeCurrent(
+        display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context
+    ):
+        raise RuntimeError("Nie udało się utworzyć kontekstu OpenGL 3.3 przez EGL")
+    return display, context
+
+
+class OffscreenRenderer:
+    """Draws figures and lights the way MyGLWidget.paintGL does, into an FBO.
+
+    Same shaders, light packing and clustering, without Qt's GL classes:
+    those need a QOpenGLContext, which a headless machine may not give.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.display, self.context = create_egl_context()
+
+        self.framebuffer = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.framebuffer)
+        for attachment, storage in (
+            (GL_COLOR_ATTACHMENT0, GL_RGBA8),
+            (GL_DEPTH_ATTACHMENT, GL_DEPTH_COMPONENT24),
+        ):
+            renderbuffer = glGenRenderbuffers(1)
+            glBindRenderbuffer(GL_RENDERBUFFER, renderbuffer)
+            glRenderbufferStorage(GL_RENDERBUFFER, storage, width, height)
+            glFramebufferRenderbuffer(
+                GL_FRAMEBUFFER, attachment, GL_RENDERBUFFER, renderbuffer
+            )
+        if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError("Framebuffer niekompletny")
+        glViewport(0, 0, width, height)
+        glEnable(GL_DEPTH_TEST)
+
+        self.figures = []  # (vao, count, index_type or None, pivot)
+        self.locations = {}
+        self.program = None
+        self.texture_buffers = {}
+
+    def init_shaders(self):
+        with open(phong_vert) as f:
+            vertex_source = f.read()
+        with open(phong_frag) as f:
+            fragment_source = f.read()
+        program = glCreateProgram()
+        glAttachShader(program, compileShader(vertex_source, GL_VERTEX_SHADER))
+        glAttachShader(program, compileShader(fragment_source, GL_FRAGMENT_SHADER))
+        glLinkProgram(program)
+        if not glGetProgramiv(program, GL_LINK_STATUS):
+            raise RuntimeError(
+                f"Błąd linkowania shaderów: {glGetProgramInfoLog(program)}"
+            )
+        self.program = program
+        glUseProgram(program)
+
+        for name, value in MATERIAL.items():
+            (glUniform3f if len(value) == 3 else glUniform1f)(
+                self.location(name), *value
+            )
+        # light data, per-cluster (offset, count), light indices; modelData is only
+        # read in batched draws but needs its own unit next to the other samplers
+        for unit, (name, texture_format) in enumerate(
+            zip(LIGHT_SAMPLERS, (GL_RGBA32F, GL_RG32UI, GL_R32UI))
+        ):
+            buffer = glGenBuffers(1)
+            texture = glGenTextures(1)
+            glBindBuffer(GL_TEXTURE_BUFFER, buffer)
+            glBufferData(GL_TEXTURE_BUFFER, 16, None, GL_DYNAMIC_DRAW)
+            glActiveTexture(GL_TEXTURE0 + unit)
+            glBindTexture(GL_TEXTURE_BUFFER, texture)
+            glTexBuffer(GL_TEXTURE_BUFFER, texture_format, buffer)
+            self.texture_buffers[name] = buffer
+            glUniform1i(self.location(name), unit)
+        glUniform1i(self.location(MODEL_SAMPLER), len(LIGHT_SAMPLERS))
+        glUniform1i(self.location("batched"), 0)
+        glActiveTexture(GL_TEXTURE0)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+
+    def location(self, name):
+        if name not in self.locations:
+            self.locations[name] = glGetUniformLocation(self.program, name)
+        return self.locations[name]
+
+    def add_figure(self, vertices_np, indices_np=None):
+        # the layout of MyGLWidget.loadModel: [x, y, z, nx, ny, nz] per vertex
+        vao = glGenVertexArrays(1)
+        glBindVertexArray(vao)
+        glBindBuffer(GL_ARRAY_BUFFER, glGenBuffers(1))
+        glBufferData(GL_ARRAY_BUFFER, vertices_np.nbytes, vertices_np, GL_STATIC_DRAW)
+        row = 6 * vertices_np.itemsize
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, row, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(
+            1, 3, GL_FLOAT, GL_FALSE, row, ctypes.c_void_p(3 * vertices_np.itemsize)
+        )
+        glEnableVertexAttribArray(1)
+        index_type = None
+        count = len(vertices_np) // 6
+        if indices_np is not None:
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, glGenBuffers(1))
+            glBufferData(
+                GL_ELEMENT_ARRAY_BUFFER, indices_np.nbytes, indices_np, GL_STATIC_DRAW
+            )
+            index_type = (
+                GL_UNSIGNED_SHORT if indices_np.dtype == np.uint16 else GL_UNSIGNED_INT
+            )
+            count = len(indices_np)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        # scale and rotation are applied around the mean of the triangle corners, as in FigureItem
+        bounds = Bounds.from_vertex_data(vertices_np, indices_np)
+        pivot = tuple(float(c) for c in bounds.centroid)
+        self.figures.append((vao, count, index_type, pivot))
+
+    def upload_texture_buffer(self, name, data):
+        glBindBuffer(GL_TEXTURE_BUFFER, self.texture_buffers[name])
+        glBufferData(GL_TEXTURE_BUFFER, data.nbytes, data, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+
+    def render(self, camera, background, figure_params, lights):
+        """Draws one frame; figure_params holds the transform params of every figure."""
+        glClearColor(background[0], background[1], background[2], 1.0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        view = camera.get_view_matrix()
+        projection = camera.get_projection_matrix(self.width / self.height)
+        glUniformMatrix4fv(
+            self.location("view"), 1, GL_FALSE, np.array(view.data(), np.float32)
+        )
+        glUniformMatrix4fv(
+            self.location("projection"),
+            1,
+            GL_FALSE,
+            np.array(projection.data(), np.float32),
+        )
+        position = camera.position
+        glUniform3f(self.location("viewPos"), position.x(), position.y(), position.z())
+
+        texels, global_count, centers, radii = pack_lights(lights)
+        self.upload_texture_buffer("lightData", texels)
+        view_rows = np.array(view.copyDataTo(), dtype=np.float64).reshape(4, 4)
+        projection_rows = np.array(projection.copyDataTo(), dtype=np.float64).reshape(
+            4, 4
+        )
+        clusters, indices = bin_lights(
+            centers @ view_rows[:3, :3].T + view_rows[:3, 3], radii, projection_rows
+        )
+        indices += global_count  # cluster lights follow the global ones
+        self.upload_texture_buffer("lightClusters", clusters)
+        self.upload_texture_buffer(
+            "lightIndices", indices if len(indices) else np.zeros(1, np.uint32)
+        )
+        glUniform1i(self.location("numGlobalLights"), global_count)
+        scale, bias = depth_slice_params(*clip_range(projection_rows))
+        glUniform4f(
+            self.location("clusterParams"), self.width, self.height, scale, bias
+        )
+
+        for (vao, count, index_type, pivot), params in zip(self.figures, figure_params):
+            if params is None:  # hidden figure
+                continue
+            model = QMatrix4x4(*transform_matrix(params, pivot).ravel())
+            glUniformMatrix4fv(
+                self.location("M"), 1, GL_FALSE, np.array(model.data(), np.float32)
+            )
+            glUniformMatrix3fv(
+                self.location("normalMatrix"),
+                1,
+                GL_FALSE,
+                np.array(model.normalMatrix().data(), np.float32),
+            )
+            glBindVertexArray(vao)
+            if index_type is not None:
+                glDrawElements(GL_TRIANGLES, count, index_type, None)
+            else:
+                glDrawArrays(GL_TRIANGLES, 0, count)
+        glBindVertexArray(0)
+        glFinish()
+
+    def read_pixels(self):
+        data = glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE)
+        image = np.frombuffer(data, dtype=np.uint8).reshape(self.height, self.width, 4)
+        return image[::-1, :, :3]  # GL rows start at the bottom
+
+    def release(self):
+        EGL.eglMakeCurrent(
+            self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT
+        )
+        EGL.eglDestroyContext(self.display, self.context)
+        EGL.eglTerminate(self.display)
+
+
+def scene_light(light, params):
+    # the light dict MyGLWidget draws from
+    values = {
+        name: QVector3D(*params[name]) for name, width in LIGHT_FIELDS if width == 3
+    }
+    return dict(values, range=max(0.0, float(params["range"])), visible=light.visible)
+
+
+def parse_size(text):
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="render a saved scene without a display"
+    )
+    parser.add_argument("scene", help="scene file written by the editor (Save scene)")
+    parser.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        help="video file (.webm, .mp4) or a directory for numbered PNG frames",
+    )
+    parser.add_argument(
+        "--size", type=parse_size, default=(1280, 720), help="WIDTHxHEIGHT"
+    )
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument(
+        "--first", type=int, help="first frame, the first keyframe by default"
+    )
+    parser.add_argument(
+        "--last", type=int, help="last frame, the last keyframe by default"
+    )
+    args = parser.parse_args()
+
+    timings = {}
+
+    def stage(name, start):
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+    total_start = time.perf_counter()
+    start = time.perf_counter()
+    scene = load_scene(args.scene)
+    keyframes = scene["keyframes"] or [0]
+    first = keyframes[0] if args.first is None else args.first
+    last = keyframes[-1] if args.last is None else args.last
+    if last < first:
+        parser.error("--last przed --first")
+    stage("scene", start)
+
+    start = time.perf_counter()
+    width, height = args.size
+    renderer = OffscreenRenderer(width, height)
+    stage("context", start)
+
+    start = time.perf_counter()
+    renderer.init_shaders()
+    stage("shaders", start)
+
+    start = time.perf_counter()
+    mesh_cache = MeshCache()
+    for figure in scene["figures"]:
+        vertices_np, indices_np, _, _ = load_model_geometry(
+            figure.path, mesh_cache, smooth=figure.smooth
+        )
+        renderer.add_figure(np.ascontiguousarray(vertices_np), indices_np)
+    stage("models", start)
+
+    start = time.perf_counter()
+    figures = scene["figures"]
+    baked = TimelineBake().bake(figures, first, last)
+    baked_lights = TimelineBake(LIGHT_FIELDS, light_defaults).bake(
+        scene["lights"], first, last
+    )
+    stage("bake", start)
+
+    camera_data = scene["camera"]
+    camera = Camera(
+        position=QVector3D(*camera_data["position"]),
+        yaw=camera_data["yaw"],
+        pitch=camera_data["pitch"],
+        zoom_fov=camera_data["zoom_fov"],
+    )
+
+    extension = os.path.splitext(args.output)[1].lower()
+    if extension in VIDEO_CODECS:
+        writer = iio.get_writer(
+            args.output,
+            fps=args.fps,
+            codec=VIDEO_CODECS[extension],
+            macro_block_size=None,
+        )
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        writer = None
+
+    try:
+        for frame_index in range(len(baked)):
+            frame = first + frame_index
+            start = time.perf_counter()
+            figure_params = [
+                params_from_row(row) if figure.visible else None
+                for figure, row in zip(figures, baked[frame_index])
+            ]
+            lights = [
+                scene_light(light, params_from_row(row, LIGHT_FIELDS))
+                for light, row in zip(scene["lights"], baked_lights[frame_index])
+            ]
+            renderer.render(camera, scene["background"], figure_params, lights)
+            stage("render", start)
+
+            start = time.perf_counter()
+            image = renderer.read_pixels()
+            stage("readback", start)
+
+            start = time.perf_counter()
+            if writer is not None:
+                writer.append_data(image)
+            else:
+                iio.imwrite(os.path.join(args.output, f"frame_{frame:05d}.png"), image)
+            stage("encode", start)
+    finally:
+        start = time.perf_counter()
+        if writer is not None:
+            writer.close()
+        stage("encode", start)
+        renderer.release()
+
+    frame_count = len(baked)
+    print(f"{frame_count} klatek {width}x{height} -> {args.output}")
+    for name, seconds in timings.items():
+        per_frame = (
+            f"  ({seconds / frame_count * 1e3:8.2f} ms/klatkę)"
+            if name in ("render", "readback", "encode")
+            else ""
+        )
+        print(f"  {name:<9} {seconds * 1e3:10.1f} ms{per_frame}")
+    print(f"  {'total':<9} {(time.perf_counter() - total_start) * 1e3:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
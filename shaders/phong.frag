@@ -2,18 +2,21 @@
 
 in vec3 FragPos;
 in vec3 Normal;
+in float ViewDepth;
 
-struct Light {
-    vec3 position;
-    vec3 ambient;
-    vec3 diffuse;
-    vec3 specular;
-};
+// Lights live in a texture buffer, four RGBA32F texels per light:
+// (position, range), ambient, diffuse, specular. The first numGlobalLights
+// lights have no range and shade every fragment; the others are binned on
+// the CPU into a grid of view-space clusters and a fragment only loops over
+// the lights listed for its own cluster.
+uniform samplerBuffer lightData;
+uniform usamplerBuffer lightClusters; // (offset, count) into lightIndices per cluster
+uniform usamplerBuffer lightIndices;
+uniform int numGlobalLights;
+// viewport width and height, depth slice scale and bias
+uniform vec4 clusterParams;
 
-const int MAX_LIGHTS = 8;
-
-uniform int numLights;
-uniform Light lights[MAX_LIGHTS];
+const ivec3 CLUSTER_GRID = ivec3(16, 9, 24);
 
 uniform vec3 material_ambient;
 uniform vec3 material_diffuse;
@@ -25,6 +28,32 @@ uniform vec3 objectColor;
 
 out vec4 FragColor;
 
+vec3 shade(int light, vec3 N, vec3 V)
+{
+	vec4 positionRange = texelFetch(lightData, 4 * light);
+	vec3 toLight = positionRange.xyz - FragPos;
+
+	// lights with a range fade out smoothly and reach exactly zero at it
+	float attenuation = 1.0;
+	if (positionRange.w > 0.0) {
+		float ratio = length(toLight) / positionRange.w;
+		attenuation = clamp(1.0 - ratio * ratio, 0.0, 1.0);
+		attenuation *= attenuation;
+	}
+
+	vec3 ambient = texelFetch(lightData, 4 * light + 1).rgb * material_ambient;
+
+	vec3 L = normalize(toLight);
+	float cosNL = clamp(dot(N, L), 0.0, 1.0);
+	vec3 diffuse = texelFetch(lightData, 4 * light + 2).rgb * (cosNL * material_diffuse);
+
+	vec3 R = reflect(-L, N);
+	float spec = pow(max(dot(V, R), 0.0), material_shininess);
+	vec3 specular = texelFetch(lightData, 4 * light + 3).rgb * (spec * material_specular);
+
+	return attenuation * (ambient + diffuse + specular);
+}
+
 void main()
 {
 	vec3 N = normalize(Normal);
@@ -32,26 +61,22 @@ void main()
 
 	vec3 result = vec3(0.0);
 
-	for (int i = 0; i < numLights; ++i){
-
-		vec3 ambient = lights[i].ambient * material_ambient;
-		
-		vec3 L = normalize(lights[i].position - FragPos);
-		float cosNL = clamp(dot(N, L), 0.0, 1.0);
-		
-		vec3 diffuse = lights[i].diffuse * (cosNL * material_diffuse);
-
-		
-		// vec3 R = reflect(FragPos - light_position, Normal);
-		vec3 R = reflect(-L, N);
-		// float cosVR = clamp(dot(V, R), 0.0, 1.0);
-		float spec = pow(max(dot(V, R), 0.0), material_shininess);
-
-		//vec3 specular = light_shininess * material_shininess * cosVR; 
-		vec3 specular = lights[i].specular * (spec * material_specular);
+	for (int i = 0; i < numGlobalLights; ++i){
+		result += shade(i, N, V);
+	}
 
-		result += ambient + diffuse + specular;
-	
+	ivec3 cell = ivec3(
+		int(gl_FragCoord.x / clusterParams.x * CLUSTER_GRID.x),
+		int(gl_FragCoord.y / clusterParams.y * CLUSTER_GRID.y),
+		int(floor(log(ViewDepth) * clusterParams.z - clusterParams.w))
+	);
+	cell = clamp(cell, ivec3(0), CLUSTER_GRID - 1);
+	int cluster = (cell.z * CLUSTER_GRID.y + cell.y) * CLUSTER_GRID.x + cell.x;
+	uvec2 range = texelFetch(lightClusters, cluster).rg;
+	for (uint i = 0u; i < range.y; ++i){
+		int light = int(texelFetch(lightIndices, int(range.x + i)).r);
+		result += shade(light, N, V);
 	}
+
 	FragColor = vec4(clamp(result, 0.0, 1.0), 1.0);
 }
@@ -2,20 +2,46 @@
 
 layout (location = 0) in vec3 aPos;
 layout (location = 1) in vec3 aNormal;
+layout (location = 2) in int aFigure; // number of the figure, only in static batches
 
 uniform mat4 projection;
 uniform mat4 view;
 uniform mat4 M;
+uniform mat3 normalMatrix; // inverse transpose of M, keeps normals right under non-uniform scale
+
+// Batched draws take M and normalMatrix per vertex from a texture buffer,
+// seven RGBA32F texels per figure: the columns of M, then of normalMatrix.
+uniform bool batched;
+uniform samplerBuffer modelData;
 
 out vec3 FragPos;
 out vec3 Normal;
+out float ViewDepth; // distance along the view direction, picks the light cluster
 
 void main()
 {
+	mat4 model = M;
+	mat3 normalModel = normalMatrix;
+	if (batched) {
+		int base = 7 * aFigure;
+		model = mat4(
+			texelFetch(modelData, base),
+			texelFetch(modelData, base + 1),
+			texelFetch(modelData, base + 2),
+			texelFetch(modelData, base + 3)
+		);
+		normalModel = mat3(
+			texelFetch(modelData, base + 4).xyz,
+			texelFetch(modelData, base + 5).xyz,
+			texelFetch(modelData, base + 6).xyz
+		);
+	}
 
-	FragPos = (M * vec4(aPos, 1.0)).xyz;
-	Normal = (M * vec4(aNormal, 0.0)).xyz;
-	
+	vec4 worldPos = model * vec4(aPos, 1.0);
+	FragPos = worldPos.xyz;
+	Normal = normalModel * aNormal;
+	vec4 viewSpacePos = view * worldPos;
+	ViewDepth = -viewSpacePos.z;
 
-    gl_Position = projection * view * M * vec4(aPos, 1.0);
+    gl_Position = projection * viewSpacePos;
 }
\ No newline at end of file
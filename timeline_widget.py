@@ -0,0 +1,145 @@
+from bisect import bisect_left
+
+from PyQt5.QtWidgets import QAbstractScrollArea
+from PyQt5.QtCore import Qt, QRect, pyqtSignal
+from PyQt5.QtGui import QPainter, QColor, QPen
+
+MIN_CELL_WIDTH = 4
+MAX_CELL_WIDTH = 80
+KEYFRAME_COLOR = QColor("lightblue")
+CHOSEN_COLOR = QColor("red")
+LABEL_STEPS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class TimelineWidget(QAbstractScrollArea):
+    """Custom-painted frame strip.
+
+    Only the cells inside the viewport are drawn, and keyframes are looked up
+    in the sorted keyframe list by bisection, so painting and clicking cost
+    the same for 100 frames and for 100k. Ctrl + wheel zooms around the
+    cursor, the wheel alone scrolls.
+    """
+
+    frame_clicked = pyqtSignal(int)
+
+    def __init__(self, frame_count=100, parent=None):
+        super().__init__(parent)
+        self.frame_count = frame_count
+        self.cell_width = 40
+        self.chosen_frame = -1
+        self.keyframes = []  # sorted frame numbers
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setFixedHeight(40 + self.horizontalScrollBar().sizeHint().height() + 4)
+        self.update_scroll_range()
+
+    def set_frame_count(self, frame_count):
+        self.frame_count = max(1, frame_count)
+        self.update_scroll_range()
+        self.viewport().update()
+
+    def set_keyframes(self, keyframes):
+        self.keyframes = keyframes
+        self.viewport().update()
+
+    def set_chosen_frame(self, frame):
+        self.chosen_frame = frame
+        self.ensure_visible(frame)
+        self.viewport().update()
+
+    def frame_at(self, x):
+        frame = (x + self.horizontalScrollBar().value()) // self.cell_width + 1
+        return frame if 1 <= frame <= self.frame_count else -1
+
+    def ensure_visible(self, frame):
+        scroll_bar = self.horizontalScrollBar()
+        left = (frame - 1) * self.cell_width
+        if left < scroll_bar.value():
+            scroll_bar.setValue(left)
+        elif left + self.cell_width > scroll_bar.value() + self.viewport().width():
+            scroll_bar.setValue(left + self.cell_width - self.viewport().width())
+
+    def update_scroll_range(self):
+        scroll_bar = self.horizontalScrollBar()
+        width = self.viewport().width()
+        scroll_bar.setRange(0, max(0, self.frame_count * self.cell_width - width))
+        scroll_bar.setPageStep(width)
+        scroll_bar.setSingleStep(self.cell_width)
+
+    def set_cell_width(self, cell_width, anchor_x=0):
+        # zoom keeps the frame under anchor_x in place
+        cell_width = max(MIN_CELL_WIDTH, min(MAX_CELL_WIDTH, cell_width))
+        if cell_width == self.cell_width:
+            return
+        scroll_bar = self.horizontalScrollBar()
+        position = (scroll_bar.value() + anchor_x) / self.cell_width
+        self.cell_width = cell_width
+        self.update_scroll_range()
+        scroll_bar.setValue(int(position * cell_width - anchor_x))
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        offset = self.horizontalScrollBar().value()
+        width = self.viewport().width()
+        height = self.viewport().height()
+        cell = self.cell_width
+
+        first = offset // cell + 1
+        last = min(self.frame_count, (offset + width) // cell + 1)
+        # with narrow cells, label only every n-th frame
+        label_width = painter.fontMetrics().horizontalAdvance(str(last)) + 6
+        label_every = next(step for step in LABEL_STEPS if step * cell >= label_width)
+
+        painter.setPen(QPen(Qt.GlobalColor.black))
+        key_index = bisect_left(self.keyframes, first)
+        for frame in range(first, last + 1):
+            left = (frame - 1) * cell - offset
+            if key_index < len(self.keyframes) and self.keyframes[key_index] == frame:
+                key_index += 1
+                painter.fillRect(left, 0, cell, height, KEYFRAME_COLOR)
+            if label_every == 1:
+                painter.drawRect(left, 0, cell - 1, height - 1)
+                painter.drawText(
+                    QRect(left, 0, cell, height),
+                    Qt.AlignmentFlag.AlignCenter,
+                    str(frame),
+                )
+            elif frame % label_every == 0:
+                # zoomed out: a full line and a label only every few frames
+                painter.drawLine(left, 0, left, height)
+                painter.drawText(
+                    QRect(left + 3, 0, label_every * cell, height),
+                    Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                    str(frame),
+                )
+            else:
+                painter.drawLine(left, height - height // 4, left, height)
+
+        if first <= self.chosen_frame <= last:
+            rect = QRect(
+                (self.chosen_frame - 1) * cell - offset, 0, cell - 1, height - 1
+            )
+            painter.setPen(QPen(CHOSEN_COLOR, 4))
+            painter.drawRect(rect.adjusted(2, 2, -1, -1))
+        painter.end()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scroll_range()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            frame = self.frame_at(event.pos().x())
+            if frame != -1:
+                self.frame_clicked.emit(frame)
+        super().mousePressEvent(event)
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+            self.set_cell_width(round(self.cell_width * 1.25**steps), event.pos().x())
+        else:
+            scroll_bar = self.horizontalScrollBar()
+            scroll_bar.setValue(int(scroll_bar.value() - steps * 3 * self.cell_width))
+        event.accept()
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class Bounds:
+    """Centroid, axis-aligned box and bounding sphere of a mesh.
+
+    Computed once from the vertex data; a transformed copy is derived from
+    the 4x4 model matrix alone, without touching the vertices again.
+    """
+
+    def __init__(self, centroid, aabb_min, aabb_max, sphere_center, sphere_radius):
+        self.centroid = np.asarray(centroid, dtype=np.float64)
+        self.aabb_min = np.asarray(aabb_min, dtype=np.float64)
+        self.aabb_max = np.asarray(aabb_max, dtype=np.float64)
+        self.sphere_center = np.asarray(sphere_center, dtype=np.float64)
+        self.sphere_radius = float(sphere_radius)
+
+    @classmethod
+    def from_vertex_data(cls, vertex_data, indices=None):
+        # vertex_data in the format: [x, y, z, nx, ny, nz]; with `indices` the
+        # rows are unique vertices, the centroid still weighs every corner
+        positions = np.asarray(vertex_data, dtype=np.float64).reshape(-1, 6)[:, :3]
+        if len(positions) == 0:
+            zero = np.zeros(3)
+            return cls(zero, zero, zero, zero, 0.0)
+        aabb_min = positions.min(axis=0)
+        aabb_max = positions.max(axis=0)
+        # the box center is not the tightest sphere center, but a single pass
+        # over the vertices gives a radius that is never too small
+        center = (aabb_min + aabb_max) / 2
+        radius = np.sqrt(((positions - center) ** 2).sum(axis=1).max())
+        if indices is None:
+            centroid = positions.mean(axis=0)
+        else:
+            uses = np.bincount(np.asarray(indices).ravel(), minlength=len(positions))
+            centroid = uses @ positions / uses.sum()
+        return cls(centroid, aabb_min, aabb_max, center, radius)
+
+    def transformed(self, matrix):
+        matrix = np.asarray(matrix, dtype=np.float64)
+        linear, offset = matrix[:3, :3], matrix[:3, 3]
+
+        # the box of a transformed box: same center mapping, extents through |L|
+        center = linear @ ((self.aabb_min + self.aabb_max) / 2) + offset
+        extent = np.abs(linear) @ ((self.aabb_max - self.aabb_min) / 2)
+        # spectral norm: the largest stretch the matrix applies to any direction
+        stretch = np.linalg.norm(linear, 2)
+
+        return Bounds(
+            linear @ self.centroid + offset,
+            center - extent,
+            center + extent,
+            linear @ self.sphere_center + offset,
+            self.sphere_radius * stretch,
+        )
+
+    def size(self):
+        return self.aabb_max - self.aabb_min
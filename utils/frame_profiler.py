@@ -0,0 +1,122 @@
+import csv
+import ctypes
+import time
+from collections import deque
+
+from OpenGL.GL import (
+    glGenQueries,
+    glQueryCounter,
+    glGetQueryObjectiv,
+    GL_TIMESTAMP,
+    GL_QUERY_RESULT,
+    GL_QUERY_RESULT_AVAILABLE,
+)
+
+# the wrapped glGetQueryObjectui64v cannot allocate its 64-bit output array
+from OpenGL.raw.GL.VERSION.GL_3_3 import glGetQueryObjectui64v
+
+HISTORY_FRAMES = 240
+
+
+class FrameProfiler:
+    """CPU and GPU time of the sections of every painted frame.
+
+    A frame is split into consecutive sections; section(name) ends the
+    previous one and starts the next. At every boundary the CPU clock is
+    read and a GL_TIMESTAMP query is written into the command stream. The
+    query results are read only once the GPU reports them available, a few
+    frames later, so profiling never waits for the pipeline to drain.
+
+    Names may be nested with "/" ("draw/figure 3"); the time of a nested
+    section also counts for its parent ("draw"). Finished frames are kept
+    in `history`, oldest first, as dicts with the frame number, total
+    "cpu_ms" and "gpu_ms" and per-section "cpu" and "gpu" times in ms.
+    """
+
+    def __init__(self, history=HISTORY_FRAMES):
+        self.history = deque(maxlen=history)
+        self.frames_started = 0
+        self._pending = deque()  # frames whose queries are still in flight
+        self._free_queries = []
+        self._frame = None
+
+    def begin_frame(self):
+        self.collect()
+        self.frames_started += 1
+        self._frame = {"number": self.frames_started, "marks": []}
+
+    def section(self, name):
+        self._mark(name)
+
+    def end_frame(self):
+        self._mark(None)
+        self._pending.append(self._frame)
+        self._frame = None
+
+    def discard_pending(self):
+        while self._pending:
+            self._free_queries.extend(
+                query for _, _, query in self._pending.popleft()["marks"]
+            )
+
+    def collect(self):
+        # timestamps complete in order, the last query of a frame tells for the whole frame
+        while self._pending:
+            frame = self._pending[0]
+            last_query = frame["marks"][-1][2]
+            if not glGetQueryObjectiv(last_query, GL_QUERY_RESULT_AVAILABLE):
+                break
+            self._pending.popleft()
+            self.history.append(self._finish(frame))
+
+    def _mark(self, name):
+        if self._free_queries:
+            query = self._free_queries.pop()
+        else:
+            query = int(glGenQueries(1)[0])
+        glQueryCounter(query, GL_TIMESTAMP)
+        self._frame["marks"].append((name, time.perf_counter(), query))
+
+    def _finish(self, frame):
+        marks = frame["marks"]
+        gpu_times = []
+        result = ctypes.c_uint64()
+        for _, _, query in marks:
+            glGetQueryObjectui64v(query, GL_QUERY_RESULT, ctypes.byref(result))
+            gpu_times.append(result.value)
+            self._free_queries.append(query)
+
+        cpu, gpu = {}, {}
+        for index, (name, cpu_start, _) in enumerate(marks[:-1]):
+            cpu_ms = (marks[index + 1][1] - cpu_start) * 1e3
+            gpu_ms = (gpu_times[index + 1] - gpu_times[index]) / 1e6
+            parts = name.split("/")
+            for depth in range(1, len(parts) + 1):
+                key = "/".join(parts[:depth])
+                cpu[key] = cpu.get(key, 0.0) + cpu_ms
+                gpu[key] = gpu.get(key, 0.0) + gpu_ms
+        return {
+            "frame": frame["number"],
+            "cpu_ms": (marks[-1][1] - marks[0][1]) * 1e3,
+            "gpu_ms": (gpu_times[-1] - gpu_times[0]) / 1e6,
+            "cpu": cpu,
+            "gpu": gpu,
+        }
+
+    def write_csv(self, path):
+        """One row per finished frame, one column per section and clock."""
+        sections = sorted({name for frame in self.history for name in frame["cpu"]})
+        gpu_sections = sorted({name for frame in self.history for name in frame["gpu"]})
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(
+                ["frame", "cpu_ms", "gpu_ms"]
+                + [f"cpu {name}" for name in sections]
+                + [f"gpu {name}" for name in gpu_sections]
+            )
+            for frame in self.history:
+                writer.writerow(
+                    [frame["frame"], f"{frame['cpu_ms']:.4f}", f"{frame['gpu_ms']:.4f}"]
+                    + [f"{frame['cpu'].get(name, 0.0):.4f}" for name in sections]
+                    + [f"{frame['gpu'].get(name, 0.0):.4f}" for name in gpu_sections]
+                )
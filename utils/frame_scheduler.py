@@ -0,0 +1,96 @@
+from collections import deque
+
+from PyQt5.QtCore import Qt, QObject, QTimer, QElapsedTimer, pyqtSignal
+from PyQt5.QtGui import QGuiApplication
+
+FPS_REPORT_INTERVAL = 250  # ms
+
+
+class FrameScheduler(QObject):
+    """Merges repaint requests into at most one frame per display refresh.
+
+    request_frame() only marks the widget dirty, the repaint happens when the
+    next refresh slot comes. Animations (callbacks that have to run on every
+    frame, like camera movement with a key held) keep the scheduler ticking
+    while they are registered; without them and without requests every timer
+    is stopped, so an idle view costs nothing. fps_changed reports the rate
+    of frames actually painted and drops to 0 once nothing moves;
+    frames_requested and frames_painted count since startup how many
+    requests were merged into how many frames.
+    """
+
+    fps_changed = pyqtSignal(float)
+
+    def __init__(self, widget, parent=None):
+        super().__init__(parent)
+        self.widget = widget
+        screen = QGuiApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen else 60.0
+        self.interval = max(1, round(1000 / (refresh_rate or 60.0)))  # ms
+        self.frames_requested = 0
+        self.frames_painted = 0
+        self._animations = {}
+        self._animating = False  # animations ran on the previous tick
+        self._pending = False
+        self._clock = QElapsedTimer()
+        self._clock.start()
+        self._last_tick = -self.interval
+        self._paint_times = deque()
+        self._last_report = -FPS_REPORT_INTERVAL
+
+        self._tick_timer = QTimer(self)
+        self._tick_timer.setSingleShot(True)
+        self._tick_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._tick_timer.timeout.connect(self._tick)
+        self._idle_timer = QTimer(self)
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.timeout.connect(self._went_idle)
+
+    def request_frame(self):
+        self.frames_requested += 1
+        if self._pending:
+            return
+        self._pending = True
+        wait = self.interval - (self._clock.elapsed() - self._last_tick)
+        self._tick_timer.start(max(0, wait))
+
+    def start_animation(self, name, callback):
+        """callback(elapsed_ms) runs before every frame until stop_animation(name)."""
+        self._animations[name] = callback
+        self.request_frame()
+
+    def stop_animation(self, name):
+        self._animations.pop(name, None)
+
+    def frame_painted(self):
+        # called by the widget at the start of paintGL, right after the clear
+        now = self._clock.elapsed()
+        self.frames_painted += 1
+        self._paint_times.append(now)
+        while self._paint_times[0] < now - 1000:
+            self._paint_times.popleft()
+        if now - self._last_report >= FPS_REPORT_INTERVAL:
+            self._last_report = now
+            self.fps_changed.emit(float(len(self._paint_times)))
+        self._idle_timer.start(1000)
+
+    def _tick(self):
+        now = self._clock.elapsed()
+        # a freshly started animation advances by one frame, a stalled one by at most four
+        elapsed = (
+            min(now - self._last_tick, 4 * self.interval)
+            if self._animating
+            else self.interval
+        )
+        self._last_tick = now
+        self._pending = False
+        for callback in list(self._animations.values()):
+            callback(elapsed)
+        self.widget.update()
+        self._animating = bool(self._animations)
+        if self._animating:
+            self.request_frame()
+
+    def _went_idle(self):
+        self._paint_times.clear()
+        self.fps_changed.emit(0.0)
@@ -0,0 +1,33 @@
+import numpy as np
+
+
+def frustum_planes(view_projection):
+    """The six clip planes of a 4x4 view-projection matrix, as (6 x 4) rows a, b, c, d.
+
+    A point p is inside a plane when a*x + b*y + c*z + d >= 0; the normals
+    are unit length, so the same expression is the signed distance.
+    """
+    m = np.asarray(view_projection, dtype=np.float64)
+    planes = np.array(
+        [
+            m[3] + m[0],  # left
+            m[3] - m[0],  # right
+            m[3] + m[1],  # bottom
+            m[3] - m[1],  # top
+            m[3] + m[2],  # near
+            m[3] - m[2],  # far
+        ]
+    )
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def spheres_in_frustum(planes, spheres):
+    """Boolean mask of the (n x 4) spheres (x, y, z, radius) that reach into the frustum.
+
+    Conservative: a sphere near a frustum corner can pass although it is
+    outside, a sphere that is on screen is never rejected.
+    """
+    if len(spheres) == 0:
+        return np.zeros(0, dtype=bool)
+    distances = spheres[:, :3] @ planes[:, :3].T + planes[:, 3]
+    return (distances >= -spheres[:, 3:4]).all(axis=1)
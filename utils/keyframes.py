@@ -0,0 +1,264 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# (name, number of floats) of the animated figure parameters
+TRANSFORM_FIELDS = (
+    ("centroid", 3),
+    ("size_x", 1),
+    ("size_y", 1),
+    ("size_z", 1),
+    ("rot_x", 1),
+    ("rot_y", 1),
+    ("rot_z", 1),
+)
+
+# animated light parameters, colors are RGB, a range of 0 means unlimited
+LIGHT_FIELDS = (
+    ("position", 3),
+    ("ambient", 3),
+    ("diffuse", 3),
+    ("specular", 3),
+    ("range", 1),
+)
+
+
+def row_width(fields):
+    return sum(width for _, width in fields)
+
+
+def pack(fields, params, out=None):
+    """Flattens a {name: value} parameter dict into one row of floats."""
+    row = np.empty(row_width(fields), dtype=np.float32) if out is None else out
+    start = 0
+    for name, width in fields:
+        if width == 1:
+            row[start] = params[name]
+        else:
+            row[start : start + width] = tuple(params[name])
+        start += width
+    return row
+
+
+def unpack(fields, row):
+    """Turns a row back into a parameter dict with plain Python floats."""
+    params = {}
+    start = 0
+    for name, width in fields:
+        if width == 1:
+            params[name] = _to_float(row[start])
+        else:
+            params[name] = tuple(_to_float(c) for c in row[start : start + width])
+        start += width
+    return params
+
+
+def _to_float(value):
+    # float32 -> shortest decimal, so 0.1 stays 0.1 in the parameter fields
+    if isinstance(value, np.float32):
+        return float(str(value))
+    return float(value)
+
+
+class KeyframeTrack(MutableMapping):
+    """Keyframes of one object in struct-of-arrays form, sorted by frame.
+
+    `frames` is an int32 array and `columns` a (keyframes x width) float32
+    table with one row per keyframe, laid out by `fields`. The track still
+    behaves like the old {frame: params} dict: reading a frame gives a
+    KeyframeView that writes through to the table, and dicts can be assigned.
+
+    Bracket lookups are O(log n), and the last segment found is remembered,
+    so sequential playback resolves in O(1). Every change also records the
+    range of frames whose interpolated value it affects; take_dirty() hands
+    that range to the timeline bake.
+    """
+
+    def __init__(self, items=(), fields=TRANSFORM_FIELDS):
+        self.fields = fields
+        self.frames = np.empty(0, dtype=np.int32)
+        self.columns = np.empty((0, row_width(fields)), dtype=np.float32)
+        self._segment = 0  # index of the keyframe that starts the last segment
+        self._dirty = None
+        items = dict(items)
+        if items:
+            self.insert_many(list(items), [items[frame] for frame in items])
+
+    def __getitem__(self, frame):
+        self._index(frame)
+        return KeyframeView(self, frame)
+
+    def __setitem__(self, frame, value):
+        if isinstance(value, KeyframeView) and value.track.fields == self.fields:
+            row = value.track.row(
+                value.frame
+            ).copy()  # plain row copy, no dict round trip
+        else:
+            row = pack(self.fields, value)
+        i = self._search(frame)
+        if i == len(self.frames) or self.frames[i] != frame:
+            self.frames = np.insert(self.frames, i, frame)
+            self.columns = np.insert(self.columns, i, row, axis=0)
+        else:
+            self.columns[i] = row
+        self.touch(frame)
+
+    def __delitem__(self, frame):
+        i = self._index(frame)
+        self.frames = np.delete(self.frames, i)
+        self.columns = np.delete(self.columns, i, axis=0)
+        self.touch(frame)
+
+    def __iter__(self):
+        return iter(self.frames.tolist())
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __contains__(self, frame):
+        i = self._search(frame)
+        return i < len(self.frames) and self.frames[i] == frame
+
+    @property
+    def nbytes(self):
+        return self.frames.nbytes + self.columns.nbytes
+
+    def insert_many(self, frames, params_list):
+        """Adds or replaces many keyframes at once with a single sort."""
+        if len(frames) == 0:
+            return
+        rows = np.array(
+            [pack(self.fields, params) for params in params_list], dtype=np.float32
+        )
+        frames = np.asarray(frames, dtype=np.int32)
+        # new rows come last, so a stable sort plus "keep last" lets them win
+        all_frames = np.concatenate([self.frames, frames])
+        all_rows = np.concatenate([self.columns, rows])
+        order = np.argsort(all_frames, kind="stable")
+        all_frames, all_rows = all_frames[order], all_rows[order]
+        keep = np.append(all_frames[1:] != all_frames[:-1], True)
+        self.frames, self.columns = all_frames[keep], all_rows[keep]
+        for frame in (frames.min(), frames.max()):
+            self.touch(int(frame))
+
+    def delete_many(self, frames):
+        frames = np.asarray(frames, dtype=np.int32)
+        removed = np.isin(self.frames, frames)
+        if not removed.any():
+            return
+        gone = self.frames[removed]
+        self.frames = self.frames[~removed]
+        self.columns = self.columns[~removed]
+        for frame in (gone.min(), gone.max()):
+            self.touch(int(frame))
+
+    def row(self, frame):
+        return self.columns[self._index(frame)]
+
+    def segment(self, frame):
+        """Returns (i, j, t): value = lerp(columns[i], columns[j], t).
+
+        Frames outside the keyed range are clamped to the first or last
+        keyframe (i == j, t == 0). Raises KeyError on an empty track.
+        """
+        frames = self.frames
+        count = len(frames)
+        if count == 0:
+            raise KeyError(frame)
+        if frame <= frames.item(0):
+            return 0, 0, 0.0
+        if frame >= frames.item(-1):
+            return count - 1, count - 1, 0.0
+
+        i = self._segment
+        if not (i + 1 < count and frames.item(i) <= frame < frames.item(i + 1)):
+            i = self._search(frame, "right") - 1
+            self._segment = i
+        start, end = frames.item(i), frames.item(i + 1)
+        return i, i + 1, (frame - start) / float(end - start)
+
+    def interpolate(self, frame):
+        i, j, t = self.segment(frame)
+        if t == 0.0:
+            return self.columns[i]
+        return self.columns[i] * (1 - t) + self.columns[j] * t
+
+    def held(self, frame):
+        """Keyframe at or before `frame` (the first one for earlier frames)."""
+        if not len(self.frames):
+            raise KeyError(frame)
+        i = max(0, self._search(frame, "right") - 1)
+        return KeyframeView(self, int(self.frames[i]))
+
+    def touch(self, frame):
+        """Marks the keyframe at `frame` as changed."""
+        # frames between the neighbouring keyframes interpolate through this one,
+        # without a neighbour the change holds up to the end of the timeline
+        i = self._search(frame)
+        j = self._search(frame, "right")
+        low = int(self.frames[i - 1]) if i > 0 else float("-inf")
+        high = int(self.frames[j]) if j < len(self.frames) else float("inf")
+        if self._dirty is not None:
+            low, high = min(low, self._dirty[0]), max(high, self._dirty[1])
+        self._dirty = (low, high)
+
+    def take_dirty(self):
+        """Returns and clears the (first, last) frame range changed since the last call."""
+        dirty, self._dirty = self._dirty, None
+        return dirty
+
+    def _search(self, frame, side="left"):
+        # an int32 key keeps searchsorted from casting the whole array to int64
+        if isinstance(frame, (int, np.integer)):
+            frame = np.int32(frame)
+        return int(self.frames.searchsorted(frame, side))
+
+    def _index(self, frame):
+        i = self._search(frame)
+        if i == len(self.frames) or self.frames[i] != frame:
+            raise KeyError(frame)
+        return i
+
+
+class KeyframeView(MutableMapping):
+    """Dict-like access to one keyframe row of a KeyframeTrack."""
+
+    def __init__(self, track, frame):
+        self.track = track
+        self.frame = frame
+
+    def __getitem__(self, name):
+        start, width = self._slot(name)
+        row = self.track.row(self.frame)
+        if width == 1:
+            return _to_float(row[start])
+        return tuple(_to_float(c) for c in row[start : start + width])
+
+    def __setitem__(self, name, value):
+        start, width = self._slot(name)
+        row = self.track.row(self.frame)
+        if width == 1:
+            row[start] = value
+        else:
+            row[start : start + width] = tuple(value)
+        self.track.touch(self.frame)
+
+    def __delitem__(self, name):
+        raise TypeError("keyframe parameters cannot be removed")
+
+    def __iter__(self):
+        return (name for name, _ in self.track.fields)
+
+    def __len__(self):
+        return len(self.track.fields)
+
+    def __repr__(self):
+        return f"KeyframeView({self.frame}, {dict(self)})"
+
+    def _slot(self, name):
+        start = 0
+        for field, width in self.track.fields:
+            if field == name:
+                return start, width
+            start += width
+        raise KeyError(name)
@@ -0,0 +1,146 @@
+import numpy as np
+
+CLUSTER_GRID = (16, 9, 24)  # x tiles, y tiles, depth slices; same as in phong.frag
+LIGHT_TEXELS = 4  # RGBA32F texels per light in the lightData buffer
+LIGHT_COLUMNS = ("position", "ambient", "diffuse", "specular")
+EMPTY_SCENE_RANGE = 100.0  # default light range while there are no figures
+RANGE_MARGIN = 3.0  # default range over the distance to the farthest scene corner
+
+
+def default_light_range(position, bounds):
+    """A finite range for a new light that still reaches the whole scene.
+
+    `bounds` are the world Bounds of the figures. The range is RANGE_MARGIN
+    times the distance to the farthest corner of their common box, so the
+    falloff is mild everywhere in the scene, yet the light is binned into
+    clusters instead of shading every fragment.
+    """
+    if not bounds:
+        return EMPTY_SCENE_RANGE
+    low = np.min([b.aabb_min for b in bounds], axis=0)
+    high = np.max([b.aabb_max for b in bounds], axis=0)
+    farthest = np.maximum(np.abs(low - position), np.abs(high - position))
+    return float(RANGE_MARGIN * max(np.linalg.norm(farthest), 1.0))
+
+
+def pack_lights(lights):
+    """Visible lights as (texels, global light count, ranged centers, ranged radii).
+
+    `lights` are the light dicts MyGLWidget draws from (QVector3D colors and
+    position, "range", "visible"). Four RGBA texels per light, lights without
+    a range first: those shade every fragment, the ranged ones are binned
+    into clusters.
+    """
+    lights = [light for light in lights if light["visible"]]
+    lights.sort(key=lambda light: light["range"] > 0)
+    texels = np.zeros((max(1, len(lights)) * LIGHT_TEXELS, 4), dtype=np.float32)
+    for i, light in enumerate(lights):
+        for column, name in enumerate(LIGHT_COLUMNS):
+            value = light[name]
+            texels[i * LIGHT_TEXELS + column, :3] = (value.x(), value.y(), value.z())
+        texels[i * LIGHT_TEXELS, 3] = max(light["range"], 0.0)
+    global_count = sum(1 for light in lights if light["range"] <= 0)
+    ranged = texels[
+        global_count * LIGHT_TEXELS : len(lights) * LIGHT_TEXELS : LIGHT_TEXELS
+    ]
+    return (
+        texels,
+        global_count,
+        ranged[:, :3].astype(np.float64),
+        ranged[:, 3].astype(np.float64),
+    )
+
+
+def clip_range(projection):
+    """(near, far) of an OpenGL perspective projection matrix (row-major)."""
+    m22, m23 = projection[2, 2], projection[2, 3]
+    return m23 / (m22 - 1.0), m23 / (m22 + 1.0)
+
+
+def depth_slice_params(near, far, slices=CLUSTER_GRID[2]):
+    """(scale, bias) so that slice = floor(log(depth) * scale - bias).
+
+    Slices are spaced exponentially, so near and far clusters have a
+    similar shape on screen.
+    """
+    scale = slices / np.log(far / near)
+    return scale, np.log(near) * scale
+
+
+def bin_lights(centers, radii, projection, grid=CLUSTER_GRID):
+    """Assigns spheres of light influence to view-space clusters.
+
+    `centers` are the (n x 3) view-space light positions, `radii` their
+    ranges, `projection` the row-major 4x4 projection matrix. Returns
+    (clusters, indices): `clusters` is an (x * y * z, 2) uint32 table of
+    (offset, count) into `indices`, the list of light numbers (rows of
+    `centers`) that may reach each cluster, ordered by cluster. The test is
+    conservative: a light is listed for every cluster its bounding box
+    touches on screen and in depth.
+    """
+    tiles_x, tiles_y, slices = grid
+    cluster_count = tiles_x * tiles_y * slices
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=np.float64)
+    near, far = clip_range(projection)
+    scale, bias = depth_slice_params(near, far, slices)
+
+    # depth range, the camera looks down -z
+    depth_min = np.maximum(-centers[:, 2] - radii, near)
+    depth_max = -centers[:, 2] + radii
+    reaches = (depth_max >= near) & (depth_min <= far)
+    z0 = np.floor(np.log(depth_min) * scale - bias)
+    z1 = np.floor(np.log(np.minimum(np.maximum(depth_max, near), far)) * scale - bias)
+
+    # screen range from the 8 corners of the view-space box around the sphere;
+    # spheres crossing the near plane can cover any part of the screen
+    signs = np.array([(x, y, z) for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)])
+    corners = centers[:, None, :] + signs[None, :, :] * radii[:, None, None]
+    clip = corners @ projection[:3, :3].T + projection[:3, 3]
+    w = corners @ projection[3, :3] + projection[3, 3]
+    crosses_near = (corners[:, :, 2] > -near).any(axis=1)
+    w = np.where(w > 0, w, 1.0)  # only used when nothing crosses the near plane
+    ndc = clip[:, :, :2] / w[:, :, None]
+    ndc_min = np.where(crosses_near[:, None], -1.0, ndc.min(axis=1))
+    ndc_max = np.where(crosses_near[:, None], 1.0, ndc.max(axis=1))
+    reaches &= (ndc_max >= -1).all(axis=1) & (ndc_min <= 1).all(axis=1)
+
+    tiles = np.array([tiles_x, tiles_y])
+    first = np.clip(np.floor((ndc_min * 0.5 + 0.5) * tiles), 0, tiles - 1).astype(
+        np.int64
+    )
+    last = np.clip(np.floor((ndc_max * 0.5 + 0.5) * tiles), 0, tiles - 1).astype(
+        np.int64
+    )
+    z0 = np.clip(z0, 0, slices - 1).astype(np.int64)
+    z1 = np.clip(z1, 0, slices - 1).astype(np.int64)
+
+    lights = np.flatnonzero(reaches)
+    x0, y0 = first[lights, 0], first[lights, 1]
+    nx = last[lights, 0] - x0 + 1
+    ny = last[lights, 1] - y0 + 1
+    nz = z1[lights] - z0[lights] + 1
+    counts = nx * ny * nz
+
+    # one (cluster, light) pair per covered cluster, expanded without a Python loop
+    pair_light = np.repeat(np.arange(len(lights)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    nx_p, nxy_p = nx[pair_light], (nx * ny)[pair_light]
+    cluster = (
+        (
+            (z0[lights][pair_light] + local // nxy_p) * tiles_y
+            + y0[pair_light]
+            + (local // nx_p) % ny[pair_light]
+        )
+        * tiles_x
+        + x0[pair_light]
+        + local % nx_p
+    )
+
+    order = np.argsort(cluster, kind="stable")
+    indices = lights[pair_light[order]].astype(np.uint32)
+    per_cluster = np.bincount(cluster, minlength=cluster_count)
+    clusters = np.empty((cluster_count, 2), dtype=np.uint32)
+    clusters[:, 0] = np.cumsum(per_cluster) - per_cluster
+    clusters[:, 1] = per_cluster
+    return clusters, indices
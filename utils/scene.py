@@ -0,0 +1,106 @@
+import json
+import os
+
+import numpy as np
+
+from utils.keyframes import LIGHT_FIELDS, TRANSFORM_FIELDS, KeyframeTrack
+
+SCENE_FORMAT_VERSION = 1
+
+
+class SceneFigure:
+    """A figure of a saved scene, without any widget.
+
+    Has the attributes TimelineBake reads from a FigureItem, so a saved
+    scene is baked by the same code as the one in the editor.
+    """
+
+    def __init__(self, name, path, smooth, visible, default_params, params_in_frames):
+        self.name = name
+        self.path = path
+        self.smooth = smooth
+        self.visible = visible
+        self.default_params = default_params
+        self.params_in_frames = params_in_frames
+
+    def get_default_transform_params(self):
+        return self.default_params
+
+
+class SceneLight:
+    """A light of a saved scene; baked like a LightItem (see TimelineBake)."""
+
+    def __init__(self, name, visible, default_params, params_in_frames):
+        self.name = name
+        self.visible = visible
+        self.default_params = default_params
+        self.params_in_frames = params_in_frames
+
+    def get_default_light_params(self):
+        return self.default_params
+
+
+def track_to_dict(track):
+    return {"frames": track.frames.tolist(), "columns": track.columns.tolist()}
+
+
+def track_from_dict(data, fields):
+    track = KeyframeTrack(fields=fields)
+    if data["frames"]:
+        track.frames = np.asarray(data["frames"], dtype=np.int32)
+        track.columns = np.asarray(data["columns"], dtype=np.float32).reshape(
+            len(track.frames), -1
+        )
+    return track
+
+
+def save_scene(path, scene):
+    """Writes a scene dict (see MainWindow.scene_dict) as JSON.
+
+    Keyframe tracks are stored as their frame list and column table, model
+    paths as absolute paths.
+    """
+    data = dict(scene, version=SCENE_FORMAT_VERSION)
+    data["figures"] = [
+        dict(
+            figure,
+            path=os.path.abspath(figure["path"]),
+            keyframes=track_to_dict(figure["keyframes"]),
+        )
+        for figure in scene["figures"]
+    ]
+    data["lights"] = [
+        dict(light, keyframes=track_to_dict(light["keyframes"]))
+        for light in scene["lights"]
+    ]
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1)
+
+
+def load_scene(path):
+    """Reads a saved scene: a dict with SceneFigure and SceneLight lists."""
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("version") != SCENE_FORMAT_VERSION:
+        raise ValueError(f"Nieobsługiwana wersja sceny: {data.get('version')}")
+    data["figures"] = [
+        SceneFigure(
+            figure["name"],
+            figure["path"],
+            figure["smooth"],
+            figure["visible"],
+            figure["params"],
+            track_from_dict(figure["keyframes"], TRANSFORM_FIELDS),
+        )
+        for figure in data["figures"]
+    ]
+    data["lights"] = [
+        SceneLight(
+            light["name"],
+            light["visible"],
+            light["params"],
+            track_from_dict(light["keyframes"], LIGHT_FIELDS),
+        )
+        for light in data["lights"]
+    ]
+    return data
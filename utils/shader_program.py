@@ -0,0 +1,37 @@
+from OpenGL.GL import glGetProgramiv, glGetActiveUniform, GL_ACTIVE_UNIFORMS
+from PyQt5.QtGui import QOpenGLShaderProgram
+
+
+class ShaderProgram(QOpenGLShaderProgram):
+    """QOpenGLShaderProgram that resolves its uniform locations once.
+
+    link() looks up every active uniform, set_uniform() then goes by the
+    cached location and skips values the program already holds (a program
+    keeps its uniforms until it is relinked). Values are compared, not
+    copied, so pass a new matrix instead of modifying one already sent.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.locations = {}
+        self._values = {}
+
+    def link(self):
+        linked = super().link()
+        self.locations = {}
+        self._values = {}
+        if linked:
+            program_id = self.programId()
+            for i in range(glGetProgramiv(program_id, GL_ACTIVE_UNIFORMS)):
+                name = glGetActiveUniform(program_id, i)[0].decode()
+                location = self.uniformLocation(name)
+                if location != -1:  # built-ins such as gl_DepthRange have no location
+                    self.locations[name.removesuffix("[0]")] = location
+        return linked
+
+    def set_uniform(self, name, *value):
+        location = self.locations.get(name, -1)
+        if location == -1 or self._values.get(location) == value:
+            return
+        self._values[location] = value
+        self.setUniformValue(location, *value)
@@ -0,0 +1,57 @@
+import numpy as np
+
+BATCH_VERTICES = 1 << 20  # vertices per shared buffer before a new batch is started
+MODEL_TEXELS = (
+    7  # RGBA32F texels per figure: 4 model matrix columns, 3 normal matrix columns
+)
+
+
+def plan_batches(figures, vertex_counts, index_counts, max_vertices=BATCH_VERTICES):
+    """Groups figures into batches that can each be drawn with one multi-draw call.
+
+    `figures` are figure numbers, `vertex_counts` their vertex counts and
+    `index_counts` their index counts (0 for figures without an index
+    buffer). Indexed and non-indexed figures never share a batch, they need
+    different draw calls. Returns a list of dicts with the figures of the
+    batch in draw order and, per figure, the first vertex and the first
+    index inside the batch buffers; "vertices" and "indices" are the sizes
+    of those buffers.
+    """
+    figures = np.asarray(figures, dtype=np.int64)
+    vertex_counts = np.asarray(vertex_counts, dtype=np.int64)
+    index_counts = np.asarray(index_counts, dtype=np.int64)
+    batches = []
+    for indexed in (False, True):
+        chosen = (index_counts > 0) == indexed
+        start = 0
+        group = np.flatnonzero(chosen)
+        while start < len(group):
+            # at least one figure per batch, a single huge mesh gets its own
+            sizes = np.cumsum(vertex_counts[group[start:]])
+            stop = start + max(
+                1, int(np.searchsorted(sizes, max_vertices, side="right"))
+            )
+            members = group[start:stop]
+            first_vertex = np.cumsum(vertex_counts[members]) - vertex_counts[members]
+            first_index = np.cumsum(index_counts[members]) - index_counts[members]
+            batches.append(
+                {
+                    "indexed": indexed,
+                    "figures": figures[members],
+                    "first_vertex": first_vertex,
+                    "first_index": first_index,
+                    "vertices": int(vertex_counts[members].sum()),
+                    "indices": int(index_counts[members].sum()),
+                }
+            )
+            start = stop
+    return batches
+
+
+def model_texels(matrix, normal_matrix):
+    """The MODEL_TEXELS rows a figure takes in the modelData texture buffer."""
+    texels = np.zeros((MODEL_TEXELS, 4), dtype=np.float32)
+    # QMatrix4x4.data() and QMatrix3x3.data() are column-major, one column per texel
+    texels[:4] = np.reshape(matrix.data(), (4, 4))
+    texels[4:, :3] = np.reshape(normal_matrix.data(), (3, 3))
+    return texels
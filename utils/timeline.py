@@ -0,0 +1,91 @@
+import numpy as np
+
+from utils.keyframes import TRANSFORM_FIELDS, pack, row_width, unpack
+
+
+def params_from_row(row, fields=TRANSFORM_FIELDS):
+    # float64 first: the render path does not need the short decimal forms
+    return unpack(fields, np.asarray(row, dtype=np.float64))
+
+
+def figure_defaults(figure):
+    return figure.get_default_transform_params()
+
+
+def light_defaults(light):
+    return light.get_default_light_params()
+
+
+def bake_track(track, default_params, frames, out):
+    """Writes the interpolated rows of one keyframe track for `frames` into `out`.
+
+    np.interp clamps to the first and last keyframe outside the keyed range,
+    which is what KeyframeTrack.interpolate does. `default_params()` fills
+    the rows of an object without keyframes.
+    """
+    if not track:
+        out[:] = pack(track.fields, default_params())
+        return
+    keyed = track.frames.astype(np.float64)
+    for column in range(track.columns.shape[1]):
+        out[:, column] = np.interp(frames, keyed, track.columns[:, column])
+
+
+class TimelineBake:
+    """Parameters of every object on every frame, as one (frames x objects x params) array.
+
+    Bakes figures by default; TimelineBake(LIGHT_FIELDS, light_defaults)
+    bakes light tracks the same way. bake() keeps the array between calls:
+    the whole array is rebuilt only when the objects or the frame range
+    change, otherwise just the frames touched by keyframe edits (see
+    KeyframeTrack.take_dirty) are evaluated again.
+    """
+
+    def __init__(self, fields=TRANSFORM_FIELDS, defaults=figure_defaults):
+        self.fields = fields
+        self.defaults = defaults
+        self.first_frame = 0
+        self.figures = []
+        self.data = np.empty((0, 0, row_width(fields)), dtype=np.float32)
+
+    def bake(self, figures, first_frame, last_frame):
+        figures = list(figures)
+        frame_count = last_frame - first_frame + 1
+        if (
+            first_frame != self.first_frame
+            or frame_count != len(self.data)
+            or len(figures) != len(self.figures)
+            or any(a is not b for a, b in zip(figures, self.figures))
+        ):
+            self._bake_all(figures, first_frame, frame_count)
+            return self.data
+
+        for column, figure in enumerate(figures):
+            dirty = figure.params_in_frames.take_dirty()
+            if dirty is None:
+                continue
+            start = max(0, int(max(dirty[0], first_frame)) - first_frame)
+            stop = min(frame_count, int(min(dirty[1], last_frame)) - first_frame + 1)
+            if start < stop:
+                frames = np.arange(
+                    first_frame + start, first_frame + stop, dtype=np.float64
+                )
+                self._bake_one(figure, frames, self.data[start:stop, column])
+        return self.data
+
+    def row(self, frame_num, figure_index):
+        return self.data[frame_num - self.first_frame, figure_index]
+
+    def _bake_all(self, figures, first_frame, frame_count):
+        self.first_frame = first_frame
+        self.figures = figures
+        self.data = np.empty(
+            (frame_count, len(figures), row_width(self.fields)), dtype=np.float32
+        )
+        frames = np.arange(first_frame, first_frame + frame_count, dtype=np.float64)
+        for column, figure in enumerate(figures):
+            figure.params_in_frames.take_dirty()
+            self._bake_one(figure, frames, self.data[:, column])
+
+    def _bake_one(self, figure, frames, out):
+        bake_track(figure.params_in_frames, lambda: self.defaults(figure), frames, out)
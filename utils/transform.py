@@ -0,0 +1,71 @@
+import numpy as np
+
+
+def transform_matrix(params, pivot):
+    """4x4 affine matrix for the figure transform parameters.
+
+    Same convention as the editor fields: scale and rotation happen around
+    `pivot`, "rot_y" turns around the X axis and "rot_x" around the Y axis,
+    then the pivot lands on params["centroid"].
+    """
+    rx = np.radians(params["rot_y"])
+    ry = np.radians(params["rot_x"])
+    rz = np.radians(params["rot_z"])
+    cx, sx = np.cos(rx), np.sin(rx)
+    cy, sy = np.cos(ry), np.sin(ry)
+    cz, sz = np.cos(rz), np.sin(rz)
+
+    rot_x = np.array([[1.0, 0.0, 0.0], [0.0, cx, -sx], [0.0, sx, cx]])
+    rot_y = np.array([[cy, 0.0, sy], [0.0, 1.0, 0.0], [-sy, 0.0, cy]])
+    rot_z = np.array([[cz, -sz, 0.0], [sz, cz, 0.0], [0.0, 0.0, 1.0]])
+    scale = np.array(
+        [params["size_x"], params["size_y"], params["size_z"]], dtype=np.float64
+    )
+
+    linear = rot_z @ rot_y @ rot_x * scale  # scaling the columns == R @ diag(scale)
+    matrix = np.eye(4)
+    matrix[:3, :3] = linear
+    matrix[:3, 3] = np.asarray(
+        params["centroid"], dtype=np.float64
+    ) - linear @ np.asarray(pivot, dtype=np.float64)
+    return matrix
+
+
+def normal_matrix(matrix):
+    # inverse transpose of the linear part; keeps normals perpendicular to
+    # the surface under non-uniform scale
+    return np.linalg.inv(np.asarray(matrix)[:3, :3]).T
+
+
+def apply_transform(vertex_data, matrix):
+    """Transforms interleaved [x, y, z, nx, ny, nz] data in place."""
+    rows = vertex_data.reshape(-1, 6)
+    matrix = np.asarray(matrix, dtype=np.float64)
+    rows[:, :3] = rows[:, :3] @ matrix[:3, :3].T + matrix[:3, 3]
+    rows[:, 3:] = _unit(rows[:, 3:] @ normal_matrix(matrix).T)
+    return vertex_data
+
+
+def apply_transforms(vertex_buffers, matrices):
+    """Transforms the vertex data of many figures in one call.
+
+    Returns new float32 buffers, one per input, as views of a single stacked
+    array. Every figure is a contiguous block of rows transformed by one
+    matrix product, which is faster than gathering a matrix per vertex row.
+    """
+    if not vertex_buffers:
+        return []
+    rows = [
+        np.asarray(buffer, dtype=np.float32).reshape(-1, 6) for buffer in vertex_buffers
+    ]
+    ends = np.cumsum([len(r) for r in rows])
+    stacked = np.concatenate(rows)
+    for block, matrix in zip(np.split(stacked, ends[:-1]), matrices):
+        apply_transform(block, matrix)
+    return [block.reshape(-1) for block in np.split(stacked, ends[:-1])]
+
+
+def _unit(vectors):
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1.0
+    return vectors / lengths
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 16 * 1024**2  # 16 MB
+# model and normal QMatrix, the modelData texels and the world Bounds of one entry
+ENTRY_BYTES = 512
+
+
+def params_key(params):
+    # resolved transform parameters as a hashable key
+    return (
+        tuple(float(c) for c in params["centroid"]),
+        float(params["size_x"]),
+        float(params["size_y"]),
+        float(params["size_z"]),
+        float(params["rot_x"]),
+        float(params["rot_y"]),
+        float(params["rot_z"]),
+    )
+
+
+class TransformCache:
+    """In-memory LRU cache of ready-made figure transforms.
+
+    Entries are keyed by (figure, resolved transform parameters) and hold
+    what placing the figure needs: the model and normal matrices, their
+    modelData texels and the world bounds. Revisiting a frame then copies
+    an entry into the widget instead of rebuilding it. Entries are kept
+    until their total size goes over `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def total_bytes(self):
+        return len(self._entries) * ENTRY_BYTES
+
+    def get(self, figure, params):
+        key = (id(figure), params_key(params))
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, figure, params, entry):
+        self._entries[(id(figure), params_key(params))] = entry
+        while self.total_bytes > self.max_bytes:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def discard_figure(self, figure):
+        for key in [key for key in self._entries if key[0] == id(figure)]:
+            del self._entries[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }